@@ -0,0 +1,173 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
+
+import database
+from cache import fragments
+from dashboard import user_tag
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost: each +1 doubles the time per hash. 12 is about 100-250 ms on one core.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Hashing runs in this many worker processes, so it neither holds the GIL nor a request thread.
+HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hash jobs beyond this wait (without holding a thread) instead of piling onto the pool
+MAX_PENDING_HASHES = HASH_WORKERS * 4
+
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", str(24 * 3600)))  # Seconds
+# Authenticated users are cached per process. A user disabled or deleted through another
+# worker or instance keeps passing authentication here for up to this many seconds.
+USER_CACHE_TTL = int(os.environ.get("AUTH_USER_CACHE_TTL", "10"))
+SECRET_KEY = os.environ.get("AUTH_SECRET_KEY")
+if not SECRET_KEY:
+    # Tokens from one instance won't verify on another or after a restart; set AUTH_SECRET_KEY in production.
+    logger.warning("AUTH_SECRET_KEY is not set, using a random per-process key")
+    SECRET_KEY = secrets.token_urlsafe(32)
+
+_pool = None
+_pending = None
+# Verified against when the username doesn't exist, so a miss costs as much as a wrong password
+_dummy_hash = None
+
+
+# Password hashing
+
+def _prehash(password: str) -> bytes:
+    # bcrypt only reads the first 72 bytes; hashing first makes every byte of a long password count
+    return base64.b64encode(hashlib.sha256(password.encode()).digest())
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_prehash(password), bcrypt.gensalt(rounds)).decode()
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_prehash(password), hashed_password.encode())
+    except ValueError:
+        return False  # Not a bcrypt hash, e.g. a placeholder from before real hashing
+
+
+async def _run_in_pool(fn, *args):
+    global _pool, _pending
+    if _pool is None:
+        # Not fork: the app's background threads may hold locks at that moment, deadlocking the child
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        _pending = asyncio.Semaphore(MAX_PENDING_HASHES)
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_pool(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed_password: Optional[str]) -> bool:
+    global _dummy_hash
+    if hashed_password is None:
+        if _dummy_hash is None:
+            # Same cost as real hashes, built on first use so importing stays cheap
+            _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+        hashed_password = _dummy_hash
+    return await _run_in_pool(_verify, password, hashed_password)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Tokens: base64url(payload).base64url(HMAC-SHA256(payload)), verified without a database round trip
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def create_access_token(user_id: int) -> str:
+    now = int(time.time())
+    payload = _b64encode(json.dumps({"sub": user_id, "iat": now, "exp": now + TOKEN_TTL}).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_access_token(token: str) -> Optional[int]:
+    """Returns the user id of a valid, unexpired token, otherwise None."""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims.get("sub")
+
+
+# Users
+
+def create_user(db: Session, user, hashed_password: str) -> database.User:
+    db_user = database.User(**user.dict(exclude={"password"}), hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[database.User]:
+    return db.query(database.User).filter(database.User.username == username).first()
+
+
+def _load_user(user_id: int) -> Optional[dict]:
+    # Everything schema.User shows, so /users/me is served from the cache too
+    columns = [column for column in database.User.__table__.columns if column.key != "hashed_password"]
+    db = database.SessionLocal()
+    try:
+        user = db.query(*columns).filter(database.User.id == user_id).first()
+        return dict(user._mapping) if user is not None else None
+    finally:
+        db.close()
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> dict:
+    """Dependency for authenticated routes.
+
+    The token is checked locally and the user comes from the fragment cache,
+    which user updates and deletes invalidate, so most requests don't query
+    the users table. Changes made through other processes are seen within
+    USER_CACHE_TTL.
+    """
+    user_id = verify_access_token(credentials.credentials) if credentials is not None else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    user = fragments.get_or_load(("auth-user", user_id), [user_tag(user_id)], lambda: _load_user(user_id), ttl=USER_CACHE_TTL)
+    if user is None or user["disabled"]:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return user
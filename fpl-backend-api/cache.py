@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import SingleFlight
+
+DEFAULT_TTL = 300  # Seconds; an upper bound on staleness if an invalidation is ever missed or made elsewhere
+MAX_ENTRIES = 50_000
+
+
+class FragmentCache:
+    """In-memory cache of response fragments with tag-based invalidation.
+
+    Every entry is stored with the tags of the data it was built from, e.g.
+    "tournament:3:matches". Invalidating a tag drops every entry built from
+    it, and nothing else.
+
+    Both the entries and invalidation are per process. A write handled by
+    another worker or instance doesn't reach this cache, so an entry here
+    can be stale for up to its TTL.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._keys_by_tag = {}
+        self._generations = {}  # tag -> invalidation count
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, tags, load, ttl: float = None):
+        """Returns the cached value for key, or calls load() once and caches its result under tags.
+
+        Concurrent misses for the same key share one load(). A None result is
+        not cached. ttl overrides the cache's TTL for this entry.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        return self._loads.do(key, lambda: self._load(key, tags, load, self.ttl if ttl is None else ttl))
+
+    def _load(self, key, tags, load, ttl):
+        with self._lock:
+            generations = [self._generations.get(tag, 0) for tag in tags]
+        value = load()
+        if value is None:
+            # Not found: don't cache it, so the object is visible as soon as it's created
+            return value
+        with self._lock:
+            # A tag invalidated while we were loading means the value may already be stale: don't keep it.
+            if generations != [self._generations.get(tag, 0) for tag in tags]:
+                return value
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+fragments = FragmentCache()
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from cache import fragments
+from database import FantasyTeam, FantasyTeamGameweekScore, Gameweek, Match, User
+
+UPCOMING_MATCHES = 5  # Per tournament
+
+
+# Cache tags. Fragments are tagged with the data they were built from, and the
+# write paths in main.py invalidate exactly these tags.
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def matches_tag(tournament_id: int) -> str:
+    return f"tournament:{tournament_id}:matches"
+
+
+def scores_tag(tournament_id: int) -> str:
+    return f"tournament:{tournament_id}:scores"
+
+
+def gameweek_tag(gameweek_id: int) -> str:
+    return f"gameweek:{gameweek_id}:scores"
+
+
+def get_dashboard(db: Session, user_id: int) -> Optional[dict]:
+    """Assembles the landing page for a user from cached fragments. Returns None if the user doesn't exist."""
+    user = fragments.get_or_load(("user", user_id), [user_tag(user_id)], lambda: _load_user(db, user_id))
+    if user is None:
+        return None
+
+    fantasy_teams = []
+    upcoming_matches = []
+    seen_tournaments = set()
+    for team in user["fantasy_teams"]:
+        tournament_id = team["tournament_id"]
+        ranking = fragments.get_or_load(
+            ("ranking", tournament_id), [scores_tag(tournament_id)], lambda: _load_ranking(db, tournament_id)
+        )
+        latest_gameweek_id = ranking["latest_gameweek_id"]
+        latest_points = None
+        if latest_gameweek_id is not None:
+            gameweek_points = fragments.get_or_load(
+                ("gameweek", latest_gameweek_id),
+                [gameweek_tag(latest_gameweek_id)],
+                lambda: _load_gameweek_points(db, latest_gameweek_id),
+            )
+            latest_points = gameweek_points.get(team["id"])
+
+        total_points, rank = ranking["teams"].get(team["id"], (0.0, None))
+        fantasy_teams.append({
+            **team,
+            "latest_gameweek_id": latest_gameweek_id,
+            "latest_gameweek_points": latest_points,
+            "total_points": total_points,
+            "rank": rank,
+        })
+
+        if tournament_id not in seen_tournaments:
+            seen_tournaments.add(tournament_id)
+            upcoming_matches.extend(fragments.get_or_load(
+                ("upcoming", tournament_id), [matches_tag(tournament_id)], lambda: _load_upcoming(db, tournament_id)
+            ))
+
+    upcoming_matches.sort(key=lambda match: (match["start_time"] is None, match["start_time"] or datetime.max))
+    return {"user_id": user_id, "fantasy_teams": fantasy_teams, "upcoming_matches": upcoming_matches}
+
+
+# Invalidation hooks, called by the write paths
+def fantasy_team_changed(user_id: Optional[int], tournament_id: Optional[int]) -> None:
+    # The owner's team list and the tournament ranking both list the team
+    tags = []
+    if user_id is not None:
+        tags.append(user_tag(user_id))
+    if tournament_id is not None:
+        tags.append(scores_tag(tournament_id))
+    fragments.invalidate(*tags)
+
+
+def user_changed(user_id: int) -> None:
+    fragments.invalidate(user_tag(user_id))
+
+
+def match_changed(db: Session, match: Match) -> None:
+    tournament_id = db.query(Gameweek.tournament_id).filter(Gameweek.id == match.gameweek_id).scalar()
+    if tournament_id is not None:
+        fragments.invalidate(matches_tag(tournament_id))
+
+
+def score_changed(db: Session, fantasy_team_id: int, gameweek_id: int) -> None:
+    tournament_id = db.query(FantasyTeam.tournament_id).filter(FantasyTeam.id == fantasy_team_id).scalar()
+    tags = [gameweek_tag(gameweek_id)]
+    if tournament_id is not None:
+        tags.append(scores_tag(tournament_id))
+    fragments.invalidate(*tags)
+
+
+def tournament_scores_changed(tournament_id: int, gameweek_ids) -> None:
+    # score_changed for a whole rescore, without a lookup per score
+    fragments.invalidate(scores_tag(tournament_id), *(gameweek_tag(gameweek_id) for gameweek_id in gameweek_ids))
+
+
+# Fragment loaders. They return plain data so a fragment outlives the session that built it.
+def _load_user(db: Session, user_id: int) -> Optional[dict]:
+    if db.query(User.id).filter(User.id == user_id).first() is None:
+        return None
+    teams = db.query(FantasyTeam.id, FantasyTeam.name, FantasyTeam.tournament_id).filter(
+        FantasyTeam.user_id == user_id
+    ).order_by(FantasyTeam.id)
+    return {"fantasy_teams": [dict(row._mapping) for row in teams]}
+
+
+def _load_ranking(db: Session, tournament_id: int) -> dict:
+    totals = (
+        db.query(FantasyTeam.id, func.coalesce(func.sum(FantasyTeamGameweekScore.total_points), 0.0))
+        .outerjoin(FantasyTeamGameweekScore, FantasyTeamGameweekScore.fantasy_team_id == FantasyTeam.id)
+        .filter(FantasyTeam.tournament_id == tournament_id)
+        .group_by(FantasyTeam.id)
+        .order_by(func.coalesce(func.sum(FantasyTeamGameweekScore.total_points), 0.0).desc())
+        .all()
+    )
+    teams = {}
+    previous = None
+    for position, (team_id, total) in enumerate(totals, start=1):
+        rank = previous[1] if previous is not None and previous[0] == total else position
+        teams[team_id] = (total, rank)
+        previous = (total, rank)
+
+    latest_gameweek_id = (
+        db.query(Gameweek.id)
+        .join(FantasyTeamGameweekScore, FantasyTeamGameweekScore.gameweek_id == Gameweek.id)
+        .filter(Gameweek.tournament_id == tournament_id)
+        .order_by(Gameweek.start_date.desc(), Gameweek.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    return {"teams": teams, "latest_gameweek_id": latest_gameweek_id}
+
+
+def _load_gameweek_points(db: Session, gameweek_id: int) -> dict:
+    rows = db.query(FantasyTeamGameweekScore.fantasy_team_id, FantasyTeamGameweekScore.total_points).filter(
+        FantasyTeamGameweekScore.gameweek_id == gameweek_id
+    )
+    return {team_id: points for team_id, points in rows}
+
+
+def _load_upcoming(db: Session, tournament_id: int) -> list:
+    matches = (
+        db.query(Match.id, Match.gameweek_id, Match.home_team_id, Match.away_team_id, Match.start_time)
+        .join(Gameweek, Gameweek.id == Match.gameweek_id)
+        .filter(Gameweek.tournament_id == tournament_id, Match.is_finished.isnot(True))
+        .order_by(Match.start_time, Match.id)
+        .limit(UPCOMING_MATCHES)
+    )
+    return [{**row._mapping, "tournament_id": tournament_id} for row in matches]
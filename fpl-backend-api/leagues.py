@@ -0,0 +1,343 @@
+from typing import List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from database import (
+    FantasyTeam,
+    FantasyTeamGameweekScore,
+    Gameweek,
+    HeadToHeadFixture,
+    MiniLeague,
+    MiniLeagueMember,
+    MiniLeagueStanding,
+)
+
+CLASSIC = "classic"
+HEAD_TO_HEAD = "h2h"
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+
+def create_league(db: Session, league) -> MiniLeague:
+    db_league = MiniLeague(**league.dict())
+    db.add(db_league)
+    db.commit()
+    db.refresh(db_league)
+    return db_league
+
+
+def get_league(db: Session, league_id: int) -> MiniLeague:
+    return db.query(MiniLeague).filter(MiniLeague.id == league_id).first()
+
+
+def get_leagues(db: Session, skip: int = 0, limit: int = 100) -> List[MiniLeague]:
+    return db.query(MiniLeague).offset(skip).limit(limit).all()
+
+
+def get_standings(db: Session, league_id: int) -> List[MiniLeagueStanding]:
+    return (
+        db.query(MiniLeagueStanding)
+        .filter(MiniLeagueStanding.league_id == league_id)
+        .order_by(MiniLeagueStanding.rank)
+        .all()
+    )
+
+
+def get_fixtures(db: Session, league_id: int, gameweek_id: int = None) -> List[HeadToHeadFixture]:
+    query = db.query(HeadToHeadFixture).filter(HeadToHeadFixture.league_id == league_id)
+    if gameweek_id is not None:
+        query = query.filter(HeadToHeadFixture.gameweek_id == gameweek_id)
+    return query.order_by(HeadToHeadFixture.gameweek_id, HeadToHeadFixture.id).all()
+
+
+def add_member(db: Session, league: MiniLeague, fantasy_team: FantasyTeam) -> MiniLeagueMember:
+    """Adds a fantasy team to a league and gives it a precomputed standings row."""
+    if fantasy_team.tournament_id != league.tournament_id:
+        raise ValueError("FantasyTeam is not part of this league's tournament")
+
+    _lock_leagues(db, [league.id])
+    member = db.query(MiniLeagueMember).filter_by(league_id=league.id, fantasy_team_id=fantasy_team.id).first()
+    if member is not None:
+        db.rollback()
+        return member
+
+    member = MiniLeagueMember(league_id=league.id, fantasy_team_id=fantasy_team.id)
+    db.add(member)
+    db.add(MiniLeagueStanding(league_id=league.id, fantasy_team_id=fantasy_team.id))
+    db.flush()
+    _refresh_totals(db, [fantasy_team.id])
+    _rerank(db, league)
+    db.commit()
+    db.refresh(member)
+    return member
+
+
+def generate_h2h_fixtures(db: Session, league: MiniLeague, gameweek: Gameweek) -> List[HeadToHeadFixture]:
+    """Pairs up league members for a gameweek using a round-robin rotation.
+
+    The round is the gameweek's position in the tournament, so every gameweek
+    gets a different pairing. Calling this again for the same gameweek returns
+    the existing fixtures.
+    """
+    if league.format != HEAD_TO_HEAD:
+        raise ValueError("Fixtures can only be generated for head-to-head leagues")
+    if gameweek.tournament_id != league.tournament_id:
+        raise ValueError("Gameweek is not part of this league's tournament")
+
+    _lock_leagues(db, [league.id])
+    existing = db.query(HeadToHeadFixture).filter_by(league_id=league.id, gameweek_id=gameweek.id).all()
+    if existing:
+        db.rollback()
+        return existing
+
+    teams = [
+        team_id for (team_id,) in db.query(MiniLeagueMember.fantasy_team_id)
+        .filter(MiniLeagueMember.league_id == league.id)
+        .order_by(MiniLeagueMember.id)
+    ]
+    gameweek_ids = [
+        gameweek_id for (gameweek_id,) in db.query(Gameweek.id)
+        .filter(Gameweek.tournament_id == league.tournament_id)
+        .order_by(Gameweek.start_date, Gameweek.id)
+    ]
+    round_number = gameweek_ids.index(gameweek.id)
+
+    scores = _gameweek_points(db, gameweek.id, teams)
+    fixtures = []
+    for home, away in _round_robin_pairs(teams, round_number):
+        fixtures.append(HeadToHeadFixture(
+            league_id=league.id,
+            gameweek_id=gameweek.id,
+            home_fantasy_team_id=home,
+            away_fantasy_team_id=away,
+            home_points=scores.get(home),
+            away_points=scores.get(away),
+        ))
+    db.add_all(fixtures)
+    db.flush()
+    for team_id in teams:
+        _refresh_h2h_record(db, league.id, team_id)
+    _rerank(db, league)
+    db.commit()
+    return fixtures
+
+
+def create_gameweek_score(db: Session, score) -> FantasyTeamGameweekScore:
+    """Inserts a gameweek score and updates every league its fantasy team plays in, in one transaction."""
+    db_score = FantasyTeamGameweekScore(**score.dict())
+    db.add(db_score)
+    db.flush()
+    _apply_points(db, {(db_score.fantasy_team_id, db_score.gameweek_id): db_score.total_points})
+    db.commit()
+    db.refresh(db_score)
+    return db_score
+
+
+def update_gameweek_score(db: Session, score_id: int, score) -> Optional[FantasyTeamGameweekScore]:
+    """Updates a gameweek score and the standings it affects in one transaction. Returns None if it doesn't exist."""
+    db_score = db.query(FantasyTeamGameweekScore).filter(FantasyTeamGameweekScore.id == score_id).first()
+    if db_score is None:
+        return None
+    previous = (db_score.fantasy_team_id, db_score.gameweek_id)
+    for field, value in score.dict(exclude_unset=True).items():
+        setattr(db_score, field, value)
+    db.flush()
+    # A score moved to another team or gameweek leaves its old fixture unplayed
+    points = {previous: None, (db_score.fantasy_team_id, db_score.gameweek_id): db_score.total_points}
+    _apply_points(db, points)
+    db.commit()
+    db.refresh(db_score)
+    return db_score
+
+
+def delete_gameweek_score(db: Session, score_id: int) -> Optional[FantasyTeamGameweekScore]:
+    """Deletes a gameweek score and takes it out of the standings in one transaction.
+
+    Totals drop it and its head-to-head fixture is unplayed again. Returns
+    the deleted score, or None if it doesn't exist.
+    """
+    db_score = db.query(FantasyTeamGameweekScore).filter(FantasyTeamGameweekScore.id == score_id).first()
+    if db_score is None:
+        return None
+    db.delete(db_score)
+    db.flush()
+    _apply_points(db, {(db_score.fantasy_team_id, db_score.gameweek_id): None})
+    db.commit()
+    return db_score
+
+
+def apply_gameweek_scores(db: Session, scores: List[FantasyTeamGameweekScore]) -> None:
+    """Brings standings up to date with many changed scores at once, as after a full rescore.
+
+    Each team's totals and each head-to-head record are refreshed once and
+    each affected league is re-ranked once, all in the caller's transaction.
+    """
+    if not scores:
+        return
+    db.flush()
+    _apply_points(db, {(score.fantasy_team_id, score.gameweek_id): score.total_points for score in scores})
+
+
+def _apply_points(db: Session, points: dict) -> None:
+    # points: (fantasy team id, gameweek id) -> the gameweek's points, or None once the score is gone.
+    # Only what those scores can affect is touched: the teams' own standings, their
+    # head-to-head fixtures for the gameweeks and the opponents' records in them.
+    team_ids = {team_id for team_id, _ in points}
+    memberships = (
+        db.query(MiniLeague, MiniLeagueMember.fantasy_team_id)
+        .join(MiniLeagueMember, MiniLeagueMember.league_id == MiniLeague.id)
+        .filter(MiniLeagueMember.fantasy_team_id.in_(team_ids))
+        .all()
+    )
+    if not memberships:
+        return
+
+    leagues = {league.id: league for league, _ in memberships}
+    _lock_leagues(db, leagues)
+    _refresh_totals(db, list({team_id for _, team_id in memberships}))
+    h2h_league_ids = [league_id for league_id, league in leagues.items() if league.format == HEAD_TO_HEAD]
+    if h2h_league_ids:
+        fixtures = db.query(HeadToHeadFixture).filter(
+            HeadToHeadFixture.league_id.in_(h2h_league_ids),
+            HeadToHeadFixture.gameweek_id.in_({gameweek_id for _, gameweek_id in points}),
+            or_(
+                HeadToHeadFixture.home_fantasy_team_id.in_(team_ids),
+                HeadToHeadFixture.away_fantasy_team_id.in_(team_ids),
+            ),
+        )
+        records = set()
+        for fixture in fixtures:
+            home = (fixture.home_fantasy_team_id, fixture.gameweek_id)
+            away = (fixture.away_fantasy_team_id, fixture.gameweek_id)
+            if home in points:
+                fixture.home_points = points[home]
+            if away in points:
+                fixture.away_points = points[away]
+            for team_id in (fixture.home_fantasy_team_id, fixture.away_fantasy_team_id):
+                if team_id is not None:
+                    records.add((fixture.league_id, team_id))
+        db.flush()
+        for league_id, team_id in records:
+            _refresh_h2h_record(db, league_id, team_id)
+    for league in leagues.values():
+        _rerank(db, league)
+
+
+def get_user_standings(db: Session, user_id: int) -> List[MiniLeagueStanding]:
+    """Returns the full table of every league the user has a fantasy team in, in one query."""
+    league_ids = (
+        db.query(MiniLeagueMember.league_id)
+        .join(FantasyTeam, FantasyTeam.id == MiniLeagueMember.fantasy_team_id)
+        .filter(FantasyTeam.user_id == user_id)
+    )
+    return (
+        db.query(MiniLeagueStanding)
+        .filter(MiniLeagueStanding.league_id.in_(league_ids.scalar_subquery()))
+        .order_by(MiniLeagueStanding.league_id, MiniLeagueStanding.rank)
+        .all()
+    )
+
+
+def _round_robin_pairs(teams: list, round_number: int) -> list:
+    """(home, away) pairs for one round; with an odd team count one team gets a bye and None as away."""
+    if len(teams) % 2:
+        teams = teams + [None]  # Whoever meets None has a bye
+
+    # Circle method: keep the first team fixed and rotate the others one step per round.
+    rest = teams[1:]
+    if rest:
+        shift = round_number % len(rest)
+        rest = rest[-shift:] + rest[:-shift] if shift else rest
+    rotated = teams[:1] + rest
+    half = len(rotated) // 2
+
+    pairs = []
+    for home, away in zip(rotated[:half], reversed(rotated[half:])):
+        if home is None:
+            home, away = away, home
+        pairs.append((home, away))
+    return pairs
+
+
+def _gameweek_points(db: Session, gameweek_id: int, team_ids) -> dict:
+    rows = db.query(FantasyTeamGameweekScore.fantasy_team_id, FantasyTeamGameweekScore.total_points).filter(
+        FantasyTeamGameweekScore.gameweek_id == gameweek_id,
+        FantasyTeamGameweekScore.fantasy_team_id.in_(team_ids),
+    )
+    return {team_id: points for team_id, points in rows}
+
+
+def _refresh_totals(db: Session, fantasy_team_ids) -> None:
+    # A fantasy team's season total is the same in every league it belongs to.
+    totals = dict(
+        db.query(FantasyTeamGameweekScore.fantasy_team_id, func.sum(FantasyTeamGameweekScore.total_points))
+        .filter(FantasyTeamGameweekScore.fantasy_team_id.in_(fantasy_team_ids))
+        .group_by(FantasyTeamGameweekScore.fantasy_team_id)
+    )
+    for standing in db.query(MiniLeagueStanding).filter(MiniLeagueStanding.fantasy_team_id.in_(fantasy_team_ids)):
+        standing.total_points = totals.get(standing.fantasy_team_id) or 0.0
+
+
+def _refresh_h2h_record(db: Session, league_id: int, fantasy_team_id: int) -> None:
+    fixtures = db.query(HeadToHeadFixture).filter(
+        HeadToHeadFixture.league_id == league_id,
+        HeadToHeadFixture.away_fantasy_team_id.isnot(None),
+        HeadToHeadFixture.home_points.isnot(None),
+        HeadToHeadFixture.away_points.isnot(None),
+        or_(
+            HeadToHeadFixture.home_fantasy_team_id == fantasy_team_id,
+            HeadToHeadFixture.away_fantasy_team_id == fantasy_team_id,
+        ),
+    )
+    won = drawn = lost = 0
+    for fixture in fixtures:
+        ours, theirs = fixture.home_points, fixture.away_points
+        if fixture.away_fantasy_team_id == fantasy_team_id:
+            ours, theirs = theirs, ours
+        if ours > theirs:
+            won += 1
+        elif ours == theirs:
+            drawn += 1
+        else:
+            lost += 1
+
+    standing = db.query(MiniLeagueStanding).filter_by(league_id=league_id, fantasy_team_id=fantasy_team_id).first()
+    if standing is None:
+        return
+    standing.played = won + drawn + lost
+    standing.won = won
+    standing.drawn = drawn
+    standing.lost = lost
+    standing.league_points = won * WIN_POINTS + drawn * DRAW_POINTS
+
+
+def _lock_leagues(db: Session, league_ids) -> None:
+    # Every write that re-ranks a league holds its row lock until commit, so two score
+    # updates in one league take turns instead of each locking its own standings row and
+    # then deadlocking on the other's while re-ranking. Ascending id order keeps
+    # transactions that span several leagues from locking them in opposite orders.
+    db.query(MiniLeague.id).filter(MiniLeague.id.in_(list(league_ids))).order_by(MiniLeague.id).with_for_update().all()
+
+
+def _rerank(db: Session, league: MiniLeague) -> None:
+    standings = db.query(MiniLeagueStanding).filter(MiniLeagueStanding.league_id == league.id).all()
+    _rank(standings, league.format)
+    db.flush()
+
+
+def _rank(standings: List[MiniLeagueStanding], league_format: str) -> None:
+    if league_format == HEAD_TO_HEAD:
+        key = lambda s: (s.league_points or 0, s.total_points or 0.0)
+    else:
+        key = lambda s: s.total_points or 0.0
+    standings.sort(key=key, reverse=True)
+
+    # Standard competition ranking: tied teams share a rank and the next rank is skipped (1, 2, 2, 4).
+    previous = None
+    for position, standing in enumerate(standings, start=1):
+        rank = previous[1] if previous is not None and key(standing) == previous[0] else position
+        if standing.rank != rank:
+            standing.rank = rank
+        previous = (key(standing), rank)
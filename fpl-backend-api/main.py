@@ -1,12 +1,78 @@
-from fastapi import FastAPI, Depends, HTTPException
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
-import crud, database, schema
+import auth, crud, dashboard, database, leagues, projection, schema, scoring, stats, writebehind
+from ratelimit import ENABLED as RATE_LIMIT_ENABLED, rate_limit_middleware, rate_limited
+from singleflight import reads
+try:
+    from brotli_asgi import BrotliMiddleware  # In requirements.txt; gzip only if it is missing
+except ImportError:
+    BrotliMiddleware = None
 # from database import engine, Base # Import engine and Base for creating the db.
-from typing import List
+from typing import List, Optional
 
 # Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Set once the schema and the statistics views exist; /readyz reports 503 until then.
+schema_ready = threading.Event()
+
+
+def init_schema_with_retry():
+    # Runs off the startup path so the app serves /healthz immediately and survives
+    # the database being briefly unreachable while an instance boots.
+    delay = 1
+    while True:
+        try:
+            database.init_schema()
+            stats.create_views(database.engine)
+            schema_ready.set()
+            return
+        except Exception:
+            logger.exception("Schema initialization failed, retrying in %s s", delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=init_schema_with_retry, name="schema-init", daemon=True).start()
+    recorder = None
+    if os.environ.get("REPLAY_RECORD_PATH"):
+        # Records match-day writes for replay.py
+        import replay
+        recorder = replay.start_recording(os.environ["REPLAY_RECORD_PATH"])
+        writebehind.player_match_performances.listeners.append(
+            lambda rows: recorder.record_updates(database.PlayerMatchPerformance.__tablename__, rows)
+        )
+    yield
+    # Buffered performance updates are written before the process exits
+    writebehind.player_match_performances.stop()
+    if recorder is not None:
+        recorder.uninstall()
+    auth.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+if RATE_LIMIT_ENABLED:
+    app.middleware("http")(rate_limit_middleware)
+
+# Compress responses bigger than this many bytes. Brotli is preferred when available and falls back to gzip.
+COMPRESSION_MINIMUM_SIZE = 1000
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
 
 # Dependency to get the database session
 def get_db():
@@ -17,21 +83,45 @@ def get_db():
         db.close()
 
 
+# Health API Endpoints
+@app.get("/healthz")
+def healthz():
+    # Liveness only: the process is up and serving. Never touches the database.
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    if not schema_ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        return JSONResponse(status_code=503, content={"status": "database unavailable"})
+    return {"status": "ready"}
+
+
 # Tournament API Endpoints
 @app.post("/tournaments/", response_model=schema.Tournament)
 def create_tournament(tournament: schema.TournamentCreate, db: Session = Depends(get_db)):
     return crud.create_tournament(db=db, tournament=tournament)
 
 @app.get("/tournaments/{tournament_id}", response_model=schema.Tournament)
-def read_tournament(tournament_id: int, db: Session = Depends(get_db)):
-    db_tournament = crud.get_tournament(db=db, tournament_id=tournament_id)
+@rate_limited
+def read_tournament(tournament_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.Tournament, schema.Tournament, fields, tournament_id, "Tournament not found")
+    db_tournament = reads.do(("tournament", tournament_id), lambda: crud.get_tournament(db=db, tournament_id=tournament_id))
     if db_tournament is None:
         raise HTTPException(status_code=404, detail="Tournament not found")
     return db_tournament
 
 @app.get("/tournaments/", response_model=List[schema.Tournament])
-def read_tournaments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    tournaments = crud.get_tournaments(db=db, skip=skip, limit=limit)
+@rate_limited
+def read_tournaments(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.Tournament, schema.Tournament, fields, skip=skip, limit=limit)
+    tournaments = reads.do(("tournaments", skip, limit), lambda: crud.get_tournaments(db=db, skip=skip, limit=limit))
     return tournaments
 
 @app.put("/tournaments/{tournament_id}", response_model=schema.Tournament)
@@ -43,20 +133,63 @@ def delete_tournament(tournament_id: int, db: Session = Depends(get_db)):
     return crud.delete_tournament(db=db, tournament_id=tournament_id)
 
 
+# Scoring rule API Endpoints
+@app.get("/tournaments/{tournament_id}/scoring-rules", response_model=schema.ScoringRules)
+def read_scoring_rules(tournament_id: int, db: Session = Depends(get_db)):
+    return scoring.get_evaluator(db=db, tournament_id=tournament_id).rules
+
+@app.put("/tournaments/{tournament_id}/scoring-rules", response_model=schema.ScoringRuleSet)
+def update_scoring_rules(tournament_id: int, rules: schema.ScoringRules, db: Session = Depends(get_db)):
+    if crud.get_tournament(db=db, tournament_id=tournament_id) is None:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return scoring.set_rules(db=db, tournament_id=tournament_id, rules=rules)
+
+@app.post("/tournaments/{tournament_id}/rescore")
+def rescore_tournament(tournament_id: int, db: Session = Depends(get_db)):
+    writebehind.player_match_performances.flush()
+    return {"changed": scoring.rescore_tournament(db=db, tournament_id=tournament_id)}
+
+
+# Season statistics API Endpoints
+@app.get("/tournaments/{tournament_id}/standings", response_model=List[schema.TeamStanding])
+@rate_limited
+def read_team_standings(tournament_id: int, db: Session = Depends(get_db)):
+    return stats.get_team_standings(db=db, tournament_id=tournament_id)
+
+@app.get("/tournaments/{tournament_id}/top-scorers", response_model=List[schema.PlayerSeasonTotals])
+@rate_limited
+def read_top_scorers(tournament_id: int, limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    return stats.get_leaders(db=db, tournament_id=tournament_id, stat="goals", limit=limit)
+
+@app.get("/tournaments/{tournament_id}/top-assisters", response_model=List[schema.PlayerSeasonTotals])
+@rate_limited
+def read_top_assisters(tournament_id: int, limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    return stats.get_leaders(db=db, tournament_id=tournament_id, stat="assists", limit=limit)
+
+@app.get("/tournaments/{tournament_id}/clean-sheets", response_model=List[schema.PlayerSeasonTotals])
+@rate_limited
+def read_clean_sheets(tournament_id: int, limit: int = Query(10, ge=1, le=100), position: Optional[str] = "Goalkeeper", db: Session = Depends(get_db)):
+    return stats.get_leaders(db=db, tournament_id=tournament_id, stat="clean_sheets", limit=limit, position=position)
+
+
 # Team API Endpoints
 @app.post("/teams/", response_model=schema.Team)
 def create_team(team: schema.TeamCreate, db: Session = Depends(get_db)):
     return crud.create_team(db=db, team=team)
 
 @app.get("/teams/{team_id}", response_model=schema.Team)
-def read_team(team_id: int, db: Session = Depends(get_db)):
+def read_team(team_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.Team, schema.Team, fields, team_id, "Team not found")
     db_team = crud.get_team(db=db, team_id=team_id)
     if db_team is None:
         raise HTTPException(status_code=404, detail="Team not found")
     return db_team
 
 @app.get("/teams/", response_model=List[schema.Team])
-def read_teams(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_teams(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.Team, schema.Team, fields, skip=skip, limit=limit)
     teams = crud.get_teams(db=db, skip=skip, limit=limit)
     return teams
 
@@ -70,32 +203,59 @@ def delete_team(team_id: int, db: Session = Depends(get_db)):
 
 # User API Endpoints
 @app.post("/users/", response_model=schema.User)
-def create_user(user: schema.UserCreate, db: Session = Depends(get_db)):
-    # TODO: Implement password hashing properly (bcrypt) before storing!
-    # For demonstration, replace with a placeholder hashing function.
-    hashed_password = hash_password(user.password) # CALL A FUNCTION YOU DEFINE TO HASH THE PASSWORD
-    user_dict = user.dict(exclude={"password"}) # exclude plain password for security
-    return crud.create_user(db=db, user=schema.UserCreate(**user_dict))
+async def create_user(user: schema.UserCreate, db: Session = Depends(get_db)):
+    # Hashing runs in the auth process pool; only the insert uses a request thread.
+    hashed_password = await auth.hash_password(user.password)
+    db_user = await run_in_threadpool(auth.create_user, db, user, hashed_password)
+    dashboard.user_changed(db_user.id)
+    return db_user
+
+@app.post("/token", response_model=schema.Token)
+async def login(credentials: schema.LoginRequest, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(auth.get_user_by_username, db, credentials.username)
+    valid = await auth.verify_password(credentials.password, db_user.hashed_password if db_user else None)
+    if db_user is None or not valid or db_user.disabled:
+        raise HTTPException(status_code=401, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"})
+    return {"access_token": auth.create_access_token(db_user.id), "token_type": "bearer"}
+
+@app.get("/users/me", response_model=schema.User)
+def read_current_user(current_user: dict = Depends(auth.get_current_user)):
+    return current_user
 
 @app.get("/users/{user_id}", response_model=schema.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.User, schema.User, fields, user_id, "User not found")
     db_user = crud.get_user(db=db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @app.get("/users/", response_model=List[schema.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.User, schema.User, fields, skip=skip, limit=limit)
     users = crud.get_users(db=db, skip=skip, limit=limit)
     return users
 
 @app.put("/users/{user_id}", response_model=schema.User)
 def update_user(user_id: int, user: schema.UserUpdate, db: Session = Depends(get_db)):
-    return crud.update_user(db=db, user_id=user_id, user=user)
+    db_user = crud.update_user(db=db, user_id=user_id, user=user)
+    dashboard.user_changed(user_id)
+    return db_user
 
 @app.delete("/users/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
-    return crud.delete_user(db=db, user_id=user_id)
+    result = crud.delete_user(db=db, user_id=user_id)
+    dashboard.user_changed(user_id)
+    return result
+
+@app.get("/users/{user_id}/dashboard", response_model=schema.UserDashboard)
+def read_user_dashboard(user_id: int, db: Session = Depends(get_db)):
+    user_dashboard = dashboard.get_dashboard(db=db, user_id=user_id)
+    if user_dashboard is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_dashboard
 
 # Player API Endpoints
 @app.post("/players/", response_model=schema.Player)
@@ -103,14 +263,18 @@ def create_player(player: schema.PlayerCreate, db: Session = Depends(get_db)):
     return crud.create_player(db=db, player=player)
 
 @app.get("/players/{player_id}", response_model=schema.Player)
-def read_player(player_id: int, db: Session = Depends(get_db)):
+def read_player(player_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.Player, schema.Player, fields, player_id, "Player not found")
     db_player = crud.get_player(db=db, player_id=player_id)
     if db_player is None:
         raise HTTPException(status_code=404, detail="Player not found")
     return db_player
 
 @app.get("/players/", response_model=List[schema.Player])
-def read_players(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_players(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.Player, schema.Player, fields, skip=skip, limit=limit)
     players = crud.get_players(db=db, skip=skip, limit=limit)
     return players
 
@@ -125,27 +289,44 @@ def delete_player(player_id: int, db: Session = Depends(get_db)):
 # FantasyTeam API Endpoints
 @app.post("/fantasyteams/", response_model=schema.FantasyTeam)
 def create_fantasy_team(fantasy_team: schema.FantasyTeamCreate, db: Session = Depends(get_db)):
-    return crud.create_fantasy_team(db=db, fantasy_team=fantasy_team)
+    db_fantasy_team = crud.create_fantasy_team(db=db, fantasy_team=fantasy_team)
+    dashboard.fantasy_team_changed(db_fantasy_team.user_id, db_fantasy_team.tournament_id)
+    return db_fantasy_team
 
 @app.get("/fantasyteams/{fantasy_team_id}", response_model=schema.FantasyTeam)
-def read_fantasy_team(fantasy_team_id: int, db: Session = Depends(get_db)):
+def read_fantasy_team(fantasy_team_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.FantasyTeam, schema.FantasyTeam, fields, fantasy_team_id, "FantasyTeam not found")
     db_fantasy_team = crud.get_fantasy_team(db=db, fantasy_team_id=fantasy_team_id)
     if db_fantasy_team is None:
         raise HTTPException(status_code=404, detail="FantasyTeam not found")
     return db_fantasy_team
 
 @app.get("/fantasyteams/", response_model=List[schema.FantasyTeam])
-def read_fantasy_teams(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_fantasy_teams(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.FantasyTeam, schema.FantasyTeam, fields, skip=skip, limit=limit)
     fantasy_teams = crud.get_fantasy_teams(db=db, skip=skip, limit=limit)
     return fantasy_teams
 
 @app.put("/fantasyteams/{fantasy_team_id}", response_model=schema.FantasyTeam)
 def update_fantasy_team(fantasy_team_id: int, fantasy_team: schema.FantasyTeamUpdate, db: Session = Depends(get_db)):
-    return crud.update_fantasy_team(db=db, fantasy_team_id=fantasy_team_id, fantasy_team=fantasy_team)
+    db_fantasy_team = crud.get_fantasy_team(db=db, fantasy_team_id=fantasy_team_id)
+    if db_fantasy_team is not None:
+        dashboard.fantasy_team_changed(db_fantasy_team.user_id, db_fantasy_team.tournament_id)
+    db_fantasy_team = crud.update_fantasy_team(db=db, fantasy_team_id=fantasy_team_id, fantasy_team=fantasy_team)
+    if db_fantasy_team is not None:
+        dashboard.fantasy_team_changed(db_fantasy_team.user_id, db_fantasy_team.tournament_id)
+    return db_fantasy_team
 
 @app.delete("/fantasyteams/{fantasy_team_id}")
 def delete_fantasy_team(fantasy_team_id: int, db: Session = Depends(get_db)):
-    return crud.delete_fantasy_team(db=db, fantasy_team_id=fantasy_team_id)
+    db_fantasy_team = crud.get_fantasy_team(db=db, fantasy_team_id=fantasy_team_id)
+    deleted = crud.delete_fantasy_team(db=db, fantasy_team_id=fantasy_team_id)
+    # After the commit, so a dashboard load can't cache the deleted team again
+    if db_fantasy_team is not None:
+        dashboard.fantasy_team_changed(db_fantasy_team.user_id, db_fantasy_team.tournament_id)
+    return deleted
 
 # FantasyTeamPlayer API Endpoints
 @app.post("/fantasyteamplayers/", response_model=schema.FantasyTeamPlayer)
@@ -153,14 +334,18 @@ def create_fantasy_team_player(fantasy_team_player: schema.FantasyTeamPlayerCrea
     return crud.create_fantasy_team_player(db=db, fantasy_team_player=fantasy_team_player)
 
 @app.get("/fantasyteamplayers/{fantasy_team_player_id}", response_model=schema.FantasyTeamPlayer)
-def read_fantasy_team_player(fantasy_team_player_id: int, db: Session = Depends(get_db)):
+def read_fantasy_team_player(fantasy_team_player_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.FantasyTeamPlayer, schema.FantasyTeamPlayer, fields, fantasy_team_player_id, "FantasyTeamPlayer not found")
     db_fantasy_team_player = crud.get_fantasy_team_player(db=db, fantasy_team_player_id=fantasy_team_player_id)
     if db_fantasy_team_player is None:
         raise HTTPException(status_code=404, detail="FantasyTeamPlayer not found")
     return db_fantasy_team_player
 
 @app.get("/fantasyteamplayers/", response_model=List[schema.FantasyTeamPlayer])
-def read_fantasy_team_players(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_fantasy_team_players(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.FantasyTeamPlayer, schema.FantasyTeamPlayer, fields, skip=skip, limit=limit)
     fantasy_team_players = crud.get_fantasy_team_players(db=db, skip=skip, limit=limit)
     return fantasy_team_players
 
@@ -178,14 +363,18 @@ def create_gameweek(gameweek: schema.GameweekCreate, db: Session = Depends(get_d
     return crud.create_gameweek(db=db, gameweek=gameweek)
 
 @app.get("/gameweeks/{gameweek_id}", response_model=schema.Gameweek)
-def read_gameweek(gameweek_id: int, db: Session = Depends(get_db)):
+def read_gameweek(gameweek_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.Gameweek, schema.Gameweek, fields, gameweek_id, "Gameweek not found")
     db_gameweek = crud.get_gameweek(db=db, gameweek_id=gameweek_id)
     if db_gameweek is None:
         raise HTTPException(status_code=404, detail="Gameweek not found")
     return db_gameweek
 
 @app.get("/gameweeks/", response_model=List[schema.Gameweek])
-def read_gameweeks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_gameweeks(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.Gameweek, schema.Gameweek, fields, skip=skip, limit=limit)
     gameweeks = crud.get_gameweeks(db=db, skip=skip, limit=limit)
     return gameweeks
 
@@ -199,28 +388,51 @@ def delete_gameweek(gameweek_id: int, db: Session = Depends(get_db)):
 
 # Match API Endpoints
 @app.post("/matches/", response_model=schema.Match)
-def create_match(match: schema.MatchCreate, db: Session = Depends(get_db)):
-    return crud.create_match(db=db, match=match)
+def create_match(match: schema.MatchCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_match = crud.create_match(db=db, match=match)
+    dashboard.match_changed(db, db_match)
+    if db_match.is_finished:
+        background_tasks.add_task(stats.refresh_views)
+    return db_match
 
 @app.get("/matches/{match_id}", response_model=schema.Match)
-def read_match(match_id: int, db: Session = Depends(get_db)):
-    db_match = crud.get_match(db=db, match_id=match_id)
+@rate_limited
+def read_match(match_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.Match, schema.Match, fields, match_id, "Match not found")
+    db_match = reads.do(("match", match_id), lambda: crud.get_match(db=db, match_id=match_id))
     if db_match is None:
         raise HTTPException(status_code=404, detail="Match not found")
     return db_match
 
 @app.get("/matches/", response_model=List[schema.Match])
-def read_matches(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    matches = crud.get_matches(db=db, skip=skip, limit=limit)
+@rate_limited
+def read_matches(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.Match, schema.Match, fields, skip=skip, limit=limit)
+    matches = reads.do(("matches", skip, limit), lambda: crud.get_matches(db=db, skip=skip, limit=limit))
     return matches
 
 @app.put("/matches/{match_id}", response_model=schema.Match)
-def update_match(match_id: int, match: schema.MatchUpdate, db: Session = Depends(get_db)):
-    return crud.update_match(db=db, match_id=match_id, match=match)
+def update_match(match_id: int, match: schema.MatchUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_match = crud.update_match(db=db, match_id=match_id, match=match)
+    if db_match is not None:
+        dashboard.match_changed(db, db_match)
+    if db_match is not None and db_match.is_finished:
+        # Final stats of the match must be in before the season totals are rebuilt
+        writebehind.player_match_performances.flush()
+        background_tasks.add_task(stats.refresh_views)
+    return db_match
 
 @app.delete("/matches/{match_id}")
-def delete_match(match_id: int, db: Session = Depends(get_db)):
-    return crud.delete_match(db=db, match_id=match_id)
+def delete_match(match_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_match = crud.get_match(db=db, match_id=match_id)
+    deleted = crud.delete_match(db=db, match_id=match_id)
+    if db_match is not None:
+        dashboard.match_changed(db, db_match)
+    if db_match is not None and db_match.is_finished:
+        background_tasks.add_task(stats.refresh_views)
+    return deleted
 
 # PlayerMatchPerformance API Endpoints
 @app.post("/playermatchperformances/", response_model=schema.PlayerMatchPerformance)
@@ -228,19 +440,46 @@ def create_player_match_performance(player_match_performance: schema.PlayerMatch
     return crud.create_player_match_performance(db=db, player_match_performance=player_match_performance)
 
 @app.get("/playermatchperformances/{player_match_performance_id}", response_model=schema.PlayerMatchPerformance)
-def read_player_match_performance(player_match_performance_id: int, db: Session = Depends(get_db)):
+def read_player_match_performance(player_match_performance_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.PlayerMatchPerformance, schema.PlayerMatchPerformance, fields, player_match_performance_id, "PlayerMatchPerformance not found")
     db_player_match_performance = crud.get_player_match_performance(db=db, player_match_performance_id=player_match_performance_id)
     if db_player_match_performance is None:
         raise HTTPException(status_code=404, detail="PlayerMatchPerformance not found")
     return db_player_match_performance
 
 @app.get("/playermatchperformances/", response_model=List[schema.PlayerMatchPerformance])
-def read_player_match_performances(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_player_match_performances(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.PlayerMatchPerformance, schema.PlayerMatchPerformance, fields, skip=skip, limit=limit)
     player_match_performances = crud.get_player_match_performances(db=db, skip=skip, limit=limit)
     return player_match_performances
 
+@app.post("/playermatchperformances/flush")
+def flush_player_match_performances():
+    """Writes buffered performance updates now, for callers that need to read them back.
+
+    Only this process's buffer is flushed. Updates are buffered only when a single
+    process serves the app (see writebehind.ENABLED), so that is all there is.
+    """
+    return {"flushed": writebehind.player_match_performances.flush()}
+
 @app.put("/playermatchperformances/{player_match_performance_id}", response_model=schema.PlayerMatchPerformance)
-def update_player_match_performance(player_match_performance_id: int, player_match_performance: schema.PlayerMatchPerformanceUpdate, db: Session = Depends(get_db)):
+def update_player_match_performance(player_match_performance_id: int, player_match_performance: schema.PlayerMatchPerformanceUpdate, buffered: bool = False, db: Session = Depends(get_db)):
+    if buffered and writebehind.ENABLED:
+        # Live updates: merged with other updates of the row and written within writebehind.WINDOW.
+        # With several processes there's no buffer to merge into, and the update is written below.
+        changes = player_match_performance.dict(exclude_unset=True)
+        try:
+            writebehind.player_match_performances.submit(db, player_match_performance_id, changes)
+        except LookupError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return JSONResponse(status_code=202, content={"id": player_match_performance_id, "queued": changes})
+    if writebehind.player_match_performances.pending(player_match_performance_id):
+        # An older buffered update must not land on top of this one
+        writebehind.player_match_performances.flush()
     return crud.update_player_match_performance(db=db, player_match_performance_id=player_match_performance_id, player_match_performance=player_match_performance)
 
 @app.delete("/playermatchperformances/{player_match_performance_id}")
@@ -250,30 +489,105 @@ def delete_player_match_performance(player_match_performance_id: int, db: Sessio
 # FantasyTeamGameweekScore API Endpoints
 @app.post("/fantasyteamgameweekscores/", response_model=schema.FantasyTeamGameweekScore)
 def create_fantasy_team_gameweek_score(fantasy_team_gameweek_score: schema.FantasyTeamGameweekScoreCreate, db: Session = Depends(get_db)):
-    return crud.create_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score=fantasy_team_gameweek_score)
+    # The score and the standings it moves commit together
+    db_score = leagues.create_gameweek_score(db, fantasy_team_gameweek_score)
+    dashboard.score_changed(db, db_score.fantasy_team_id, db_score.gameweek_id)
+    return db_score
 
 @app.get("/fantasyteamgameweekscores/{fantasy_team_gameweek_score_id}", response_model=schema.FantasyTeamGameweekScore)
-def read_fantasy_team_gameweek_score(fantasy_team_gameweek_score_id: int, db: Session = Depends(get_db)):
-    db_fantasy_team_gameweek_score = crud.get_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score_id=fantasy_team_gameweek_score_id)
+@rate_limited
+def read_fantasy_team_gameweek_score(fantasy_team_gameweek_score_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.detail_response(db, database.FantasyTeamGameweekScore, schema.FantasyTeamGameweekScore, fields, fantasy_team_gameweek_score_id, "FantasyTeamGameweekScore not found")
+    db_fantasy_team_gameweek_score = reads.do(
+        ("fantasy_team_gameweek_score", fantasy_team_gameweek_score_id),
+        lambda: crud.get_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score_id=fantasy_team_gameweek_score_id),
+    )
     if db_fantasy_team_gameweek_score is None:
         raise HTTPException(status_code=404, detail="FantasyTeamGameweekScore not found")
     return db_fantasy_team_gameweek_score
 
 @app.get("/fantasyteamgameweekscores/", response_model=List[schema.FantasyTeamGameweekScore])
-def read_fantasy_team_gameweek_scores(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    fantasy_team_gameweek_scores = crud.get_fantasy_team_gameweek_scores(db=db, skip=skip, limit=limit)
+@rate_limited
+def read_fantasy_team_gameweek_scores(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    if fields:
+        return projection.list_response(db, database.FantasyTeamGameweekScore, schema.FantasyTeamGameweekScore, fields, skip=skip, limit=limit)
+    fantasy_team_gameweek_scores = reads.do(
+        ("fantasy_team_gameweek_scores", skip, limit),
+        lambda: crud.get_fantasy_team_gameweek_scores(db=db, skip=skip, limit=limit),
+    )
     return fantasy_team_gameweek_scores
 
 @app.put("/fantasyteamgameweekscores/{fantasy_team_gameweek_score_id}", response_model=schema.FantasyTeamGameweekScore)
 def update_fantasy_team_gameweek_score(fantasy_team_gameweek_score_id: int, fantasy_team_gameweek_score: schema.FantasyTeamGameweekScoreUpdate, db: Session = Depends(get_db)):
-    return crud.update_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score_id=fantasy_team_gameweek_score_id, fantasy_team_gameweek_score=fantasy_team_gameweek_score)
+    db_score = crud.get_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score_id=fantasy_team_gameweek_score_id)
+    previous = (db_score.fantasy_team_id, db_score.gameweek_id) if db_score is not None else None
+    db_score = leagues.update_gameweek_score(db, fantasy_team_gameweek_score_id, fantasy_team_gameweek_score)
+    if db_score is None:
+        raise HTTPException(status_code=404, detail="FantasyTeamGameweekScore not found")
+    if previous != (db_score.fantasy_team_id, db_score.gameweek_id):
+        dashboard.score_changed(db, *previous)
+    dashboard.score_changed(db, db_score.fantasy_team_id, db_score.gameweek_id)
+    return db_score
 
 @app.delete("/fantasyteamgameweekscores/{fantasy_team_gameweek_score_id}")
 def delete_fantasy_team_gameweek_score(fantasy_team_gameweek_score_id: int, db: Session = Depends(get_db)):
-    return crud.delete_fantasy_team_gameweek_score(db=db, fantasy_team_gameweek_score_id=fantasy_team_gameweek_score_id)
+    deleted = leagues.delete_gameweek_score(db, fantasy_team_gameweek_score_id)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="FantasyTeamGameweekScore not found")
+    dashboard.score_changed(db, deleted.fantasy_team_id, deleted.gameweek_id)
+    return deleted
+
+# MiniLeague API Endpoints
+@app.post("/minileagues/", response_model=schema.MiniLeague)
+def create_mini_league(mini_league: schema.MiniLeagueCreate, db: Session = Depends(get_db)):
+    return leagues.create_league(db=db, league=mini_league)
+
+@app.get("/minileagues/{mini_league_id}", response_model=schema.MiniLeague)
+def read_mini_league(mini_league_id: int, db: Session = Depends(get_db)):
+    db_league = leagues.get_league(db=db, league_id=mini_league_id)
+    if db_league is None:
+        raise HTTPException(status_code=404, detail="MiniLeague not found")
+    return db_league
+
+@app.get("/minileagues/", response_model=List[schema.MiniLeague])
+def read_mini_leagues(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return leagues.get_leagues(db=db, skip=skip, limit=limit)
+
+@app.post("/minileagues/{mini_league_id}/members", response_model=schema.MiniLeagueMember)
+def add_mini_league_member(mini_league_id: int, member: schema.MiniLeagueMemberCreate, db: Session = Depends(get_db)):
+    db_league = leagues.get_league(db=db, league_id=mini_league_id)
+    if db_league is None:
+        raise HTTPException(status_code=404, detail="MiniLeague not found")
+    db_fantasy_team = crud.get_fantasy_team(db=db, fantasy_team_id=member.fantasy_team_id)
+    if db_fantasy_team is None:
+        raise HTTPException(status_code=404, detail="FantasyTeam not found")
+    try:
+        return leagues.add_member(db, db_league, db_fantasy_team)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.post("/minileagues/{mini_league_id}/gameweeks/{gameweek_id}/fixtures", response_model=List[schema.HeadToHeadFixture])
+def generate_mini_league_fixtures(mini_league_id: int, gameweek_id: int, db: Session = Depends(get_db)):
+    db_league = leagues.get_league(db=db, league_id=mini_league_id)
+    if db_league is None:
+        raise HTTPException(status_code=404, detail="MiniLeague not found")
+    db_gameweek = crud.get_gameweek(db=db, gameweek_id=gameweek_id)
+    if db_gameweek is None:
+        raise HTTPException(status_code=404, detail="Gameweek not found")
+    try:
+        return leagues.generate_h2h_fixtures(db, db_league, db_gameweek)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/minileagues/{mini_league_id}/fixtures", response_model=List[schema.HeadToHeadFixture])
+def read_mini_league_fixtures(mini_league_id: int, gameweek_id: Optional[int] = None, db: Session = Depends(get_db)):
+    return leagues.get_fixtures(db=db, league_id=mini_league_id, gameweek_id=gameweek_id)
+
+@app.get("/minileagues/{mini_league_id}/standings", response_model=List[schema.MiniLeagueStanding])
+def read_mini_league_standings(mini_league_id: int, db: Session = Depends(get_db)):
+    return leagues.get_standings(db=db, league_id=mini_league_id)
 
-# Example Password Hashing Function (REPLACE WITH BCRYPT)
-def hash_password(password: str):
-    # DO NOT USE THIS IN PRODUCTION.  IT'S JUST A PLACEHOLDER.
-    # Use bcrypt, argon2, or a similar secure hashing algorithm.
-    return "insecure_hash_" + password  #  Very insecure!
\ No newline at end of file
+@app.get("/users/{user_id}/minileague-standings", response_model=List[schema.MiniLeagueStanding])
+def read_user_mini_league_standings(user_id: int, db: Session = Depends(get_db)):
+    return leagues.get_user_standings(db=db, user_id=user_id)
\ No newline at end of file
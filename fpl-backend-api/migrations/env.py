@@ -0,0 +1,88 @@
+import time
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, pool, text
+
+from alembic import context
+
+import database
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = database.Base.metadata
+
+# Every instance runs `upgrade head` on startup; this lock makes them take turns.
+MIGRATION_LOCK_ID = 720_415_001
+LOCK_POLL_INTERVAL = 0.5  # Seconds between attempts to take it
+
+# DDL that needs a table lock gives up after this instead of queueing behind
+# match-day traffic and blocking every request that arrives after it.
+LOCK_TIMEOUT = "5s"
+
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=database.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_lock(connection)
+        return
+
+    engine = create_engine(database.DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run_with_lock(connection)
+
+
+def _acquire_lock(connection) -> None:
+    # Polled outside any transaction. A waiter blocked in pg_advisory_lock() would hold
+    # a snapshot, and CREATE INDEX CONCURRENTLY in the instance holding the lock waits
+    # for every older snapshot to end: the two would wait on each other.
+    if connection.in_transaction():
+        connection.commit()
+    connection.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        while not connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}).scalar():
+            time.sleep(LOCK_POLL_INTERVAL)
+        connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+    finally:
+        connection.commit()
+        connection.execution_options(isolation_level=connection.default_isolation_level)
+
+
+def _run_with_lock(connection) -> None:
+    _acquire_lock(connection)
+    try:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            # One transaction per migration so that a migration can step out of it
+            # with op.get_context().autocommit_block() for CREATE INDEX CONCURRENTLY.
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
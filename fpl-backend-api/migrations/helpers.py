@@ -0,0 +1,61 @@
+"""Lock-safe building blocks for migrations that run against a live database."""
+import time
+
+from alembic import op
+from sqlalchemy import text
+
+
+def create_index_concurrently(name: str, table: str, columns, unique: bool = False) -> None:
+    """Builds an index without blocking writes to the table.
+
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so this steps
+    out of the migration's transaction. A build that failed half way leaves an
+    INVALID index behind; that one is dropped and rebuilt.
+    """
+    with op.get_context().autocommit_block():
+        invalid = op.get_bind().execute(
+            text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        ).first()
+        if invalid:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill_in_batches(
+    table: str, set_clause: str, where_clause: str, batch_size: int = 5000, pause: float = 0.05, locked_pause: float = 1.0
+) -> int:
+    """Runs UPDATE table SET set_clause WHERE where_clause a batch of rows at a time.
+
+    Each batch commits on its own so row locks are held briefly, and rows that
+    a live request is writing are skipped and picked up by a later batch. Once
+    only locked rows are left, this waits locked_pause seconds between tries
+    until they are free. where_clause must stop matching a row once it is
+    updated. Returns the number of rows updated.
+    """
+    statement = text(
+        f"UPDATE {table} SET {set_clause} WHERE id IN "
+        f"(SELECT id FROM {table} WHERE {where_clause} LIMIT :batch_size FOR UPDATE SKIP LOCKED)"
+    )
+    remaining = text(f"SELECT 1 FROM {table} WHERE {where_clause} LIMIT 1")
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            updated = bind.execute(statement, {"batch_size": batch_size}).rowcount
+            if updated:
+                total += updated
+                time.sleep(pause)
+                continue
+            # Nothing was free to update: done, unless the rows left are just locked right now
+            if bind.execute(remaining).first() is None:
+                return total
+            time.sleep(locked_pause)
@@ -0,0 +1,47 @@
+"""match day indexes
+
+Foreign-key indexes for the lookups that scoring, leagues and statistics do
+by team, gameweek, match and player. Built concurrently so writes to these
+tables keep flowing while the indexes build.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:04:43.171743
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_fantasy_team_gameweek_scores_gameweek_id', 'fantasy_team_gameweek_scores', ['gameweek_id']),
+    ('ix_fantasy_team_gameweek_scores_team_gameweek', 'fantasy_team_gameweek_scores', ['fantasy_team_id', 'gameweek_id']),
+    ('ix_fantasy_team_players_fantasy_team_id', 'fantasy_team_players', ['fantasy_team_id']),
+    ('ix_fantasy_teams_tournament_id', 'fantasy_teams', ['tournament_id']),
+    ('ix_fantasy_teams_user_id', 'fantasy_teams', ['user_id']),
+    ('ix_gameweeks_tournament_id', 'gameweeks', ['tournament_id']),
+    ('ix_matches_gameweek_id', 'matches', ['gameweek_id']),
+    ('ix_player_match_performances_match_id', 'player_match_performances', ['match_id']),
+    ('ix_player_match_performances_player_id', 'player_match_performances', ['player_id']),
+    ('ix_players_team_id', 'players', ['team_id']),
+    ('ix_teams_tournament_id', 'teams', ['tournament_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        drop_index_concurrently(name, table)
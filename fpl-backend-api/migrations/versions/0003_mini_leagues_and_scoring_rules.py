@@ -0,0 +1,137 @@
+"""mini-leagues and scoring rules
+
+Tables for mini-leagues, head-to-head fixtures and standings, and
+per-tournament scoring rules. Servers that ran create_all() with these
+models already have some or all of them; those tables are left as they are.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 14:20:11.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'mini_leagues' not in existing:
+        op.create_table('mini_leagues',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('tournament_id', sa.Integer(), nullable=True),
+        sa.Column('format', sa.String(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_mini_leagues_id'), 'mini_leagues', ['id'], unique=False)
+    if 'scoring_rule_sets' not in existing:
+        op.create_table('scoring_rule_sets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tournament_id', sa.Integer(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=True),
+        sa.Column('rules', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_scoring_rule_sets_id'), 'scoring_rule_sets', ['id'], unique=False)
+        op.create_index(op.f('ix_scoring_rule_sets_tournament_id'), 'scoring_rule_sets', ['tournament_id'], unique=True)
+    if 'head_to_head_fixtures' not in existing:
+        op.create_table('head_to_head_fixtures',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=True),
+        sa.Column('gameweek_id', sa.Integer(), nullable=True),
+        sa.Column('home_fantasy_team_id', sa.Integer(), nullable=True),
+        sa.Column('away_fantasy_team_id', sa.Integer(), nullable=True),
+        sa.Column('home_points', sa.Float(), nullable=True),
+        sa.Column('away_points', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['away_fantasy_team_id'], ['fantasy_teams.id'], ),
+        sa.ForeignKeyConstraint(['gameweek_id'], ['gameweeks.id'], ),
+        sa.ForeignKeyConstraint(['home_fantasy_team_id'], ['fantasy_teams.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['mini_leagues.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_head_to_head_fixtures_away_fantasy_team_id'), 'head_to_head_fixtures', ['away_fantasy_team_id'], unique=False)
+        op.create_index(op.f('ix_head_to_head_fixtures_home_fantasy_team_id'), 'head_to_head_fixtures', ['home_fantasy_team_id'], unique=False)
+        op.create_index(op.f('ix_head_to_head_fixtures_id'), 'head_to_head_fixtures', ['id'], unique=False)
+        op.create_index('ix_head_to_head_fixtures_league_gameweek', 'head_to_head_fixtures', ['league_id', 'gameweek_id'], unique=False)
+    if 'mini_league_members' not in existing:
+        op.create_table('mini_league_members',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=True),
+        sa.Column('fantasy_team_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['fantasy_team_id'], ['fantasy_teams.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['mini_leagues.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('league_id', 'fantasy_team_id')
+        )
+        op.create_index(op.f('ix_mini_league_members_fantasy_team_id'), 'mini_league_members', ['fantasy_team_id'], unique=False)
+        op.create_index(op.f('ix_mini_league_members_id'), 'mini_league_members', ['id'], unique=False)
+        op.create_index(op.f('ix_mini_league_members_league_id'), 'mini_league_members', ['league_id'], unique=False)
+    if 'mini_league_standings' not in existing:
+        op.create_table('mini_league_standings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=True),
+        sa.Column('fantasy_team_id', sa.Integer(), nullable=True),
+        sa.Column('rank', sa.Integer(), nullable=True),
+        sa.Column('total_points', sa.Float(), nullable=True),
+        sa.Column('played', sa.Integer(), nullable=True),
+        sa.Column('won', sa.Integer(), nullable=True),
+        sa.Column('drawn', sa.Integer(), nullable=True),
+        sa.Column('lost', sa.Integer(), nullable=True),
+        sa.Column('league_points', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['fantasy_team_id'], ['fantasy_teams.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['mini_leagues.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('league_id', 'fantasy_team_id')
+        )
+        op.create_index(op.f('ix_mini_league_standings_id'), 'mini_league_standings', ['id'], unique=False)
+        op.create_index('ix_mini_league_standings_league_rank', 'mini_league_standings', ['league_id', 'rank'], unique=False)
+
+    # Missing from tables that create_all() built before the model declared it
+    create_index_concurrently('ix_mini_league_standings_fantasy_team_id', 'mini_league_standings', ['fantasy_team_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_mini_league_standings_fantasy_team_id', 'mini_league_standings')
+    op.drop_index('ix_mini_league_standings_league_rank', table_name='mini_league_standings')
+    op.drop_index(op.f('ix_mini_league_standings_id'), table_name='mini_league_standings')
+    op.drop_table('mini_league_standings')
+    op.drop_index(op.f('ix_mini_league_members_league_id'), table_name='mini_league_members')
+    op.drop_index(op.f('ix_mini_league_members_id'), table_name='mini_league_members')
+    op.drop_index(op.f('ix_mini_league_members_fantasy_team_id'), table_name='mini_league_members')
+    op.drop_table('mini_league_members')
+    op.drop_index('ix_head_to_head_fixtures_league_gameweek', table_name='head_to_head_fixtures')
+    op.drop_index(op.f('ix_head_to_head_fixtures_id'), table_name='head_to_head_fixtures')
+    op.drop_index(op.f('ix_head_to_head_fixtures_home_fantasy_team_id'), table_name='head_to_head_fixtures')
+    op.drop_index(op.f('ix_head_to_head_fixtures_away_fantasy_team_id'), table_name='head_to_head_fixtures')
+    op.drop_table('head_to_head_fixtures')
+    op.drop_index(op.f('ix_scoring_rule_sets_tournament_id'), table_name='scoring_rule_sets')
+    op.drop_index(op.f('ix_scoring_rule_sets_id'), table_name='scoring_rule_sets')
+    op.drop_table('scoring_rule_sets')
+    op.drop_index(op.f('ix_mini_leagues_id'), table_name='mini_leagues')
+    op.drop_table('mini_leagues')
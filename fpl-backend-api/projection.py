@@ -0,0 +1,44 @@
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+
+def _schema_fields(schema_cls) -> List[str]:
+    # Pydantic v2 exposes model_fields, v1 __fields__
+    return list(getattr(schema_cls, "model_fields", None) or schema_cls.__fields__)
+
+
+def parse_fields(model, schema_cls, fields: str) -> list:
+    """Turns a comma separated `fields` query value into table columns of model.
+
+    Only fields that the response schema exposes can be selected, so columns
+    such as users.hashed_password are never reachable. The primary key is
+    always included.
+    """
+    allowed = [name for name in _schema_fields(schema_cls) if name in model.__table__.columns]
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    names = ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+    return [model.__table__.columns[name] for name in names]
+
+
+def list_response(db: Session, model, schema_cls, fields: str, skip: int = 0, limit: int = 100) -> JSONResponse:
+    """Lists rows of model, selecting and returning only the requested fields."""
+    columns = parse_fields(model, schema_cls, fields)
+    rows = db.query(*columns).offset(skip).limit(limit).all()
+    return JSONResponse(jsonable_encoder([dict(row._mapping) for row in rows]))
+
+
+def detail_response(db: Session, model, schema_cls, fields: str, object_id: int, not_found: str) -> JSONResponse:
+    """Fetches one row of model by id, selecting and returning only the requested fields."""
+    columns = parse_fields(model, schema_cls, fields)
+    row = db.query(*columns).filter(model.id == object_id).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return JSONResponse(jsonable_encoder(dict(row._mapping)))
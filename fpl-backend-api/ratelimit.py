@@ -0,0 +1,119 @@
+import ipaddress
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+RATE_PER_SECOND = 10.0  # Tokens refilled per second for each client/route bucket
+BURST = 20  # Bucket capacity, i.e. the largest burst a client can send at once
+MAX_BUCKETS = 100_000  # Least recently used buckets are evicted beyond this
+LIMITED_METHODS = {"GET", "HEAD"}
+# Load balancers whose X-Forwarded-For is believed, as comma-separated addresses or CIDRs.
+# Empty means clients connect directly and the header is ignored, since anyone can send it.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip())
+    for proxy in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "").split(",")
+    if proxy.strip()
+]
+# Off unless turned on. Behind a load balancer every client arrives from its address, so
+# without RATE_LIMIT_TRUSTED_PROXIES the whole site would share one client's budget.
+# Setting the proxies turns it on; RATE_LIMIT_ENABLED=1 is for instances clients reach directly.
+ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1" if TRUSTED_PROXIES else "0") == "1"
+
+
+class TokenBucketLimiter:
+    """In-memory token-bucket rate limiter keyed by (client, route)."""
+
+    def __init__(self, rate: float = RATE_PER_SECOND, burst: int = BURST, max_buckets: int = MAX_BUCKETS):
+        self.rate = rate
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def acquire(self, key) -> float:
+        """Takes one token for key. Returns 0 if allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+limiter = TokenBucketLimiter()
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_id(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+    # Each trusted proxy appends the address it received the request from, so
+    # the rightmost hop that isn't one of ours is the client; anything left of it is client-supplied.
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def rate_limited(endpoint):
+    """Marks a route's endpoint for rate limiting. Only these routes are limited, and only for GET and HEAD.
+
+    Meant for the hot reads that every client polls at once; writes, live
+    ingest and the health probes are never limited.
+    """
+    endpoint.rate_limited = True
+    return endpoint
+
+
+def _route(request: Request):
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    try:
+        route = _route(request) if request.method in LIMITED_METHODS else None
+        wait = 0.0
+        if route is not None and getattr(route.endpoint, "rate_limited", False):
+            # Keyed on the route template, e.g. /players/{player_id}, so walking ids doesn't get a fresh bucket per id
+            wait = limiter.acquire((client_id(request), request.method, route.path))
+    except Exception:
+        # Fail open: a broken limiter must never take the API down with it.
+        logger.exception("Rate limiter failed, letting request through")
+        wait = 0.0
+
+    if wait > 0:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+    return await call_next(request)
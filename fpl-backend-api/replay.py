@@ -0,0 +1,255 @@
+"""Record the match-day write stream and replay it against another database.
+
+Recording: start the API with REPLAY_RECORD_PATH=/path/to/gameweek.jsonl and
+every committed insert, update and delete of a Match or PlayerMatchPerformance
+row is appended to that file, in commit order.
+
+Replaying, against a local copy of the database as it was before the gameweek:
+
+    python replay.py gameweek.jsonl --database-url postgresql://localhost/hillsidefpl --speed 10
+
+--speed 10 plays the recording ten times faster than it happened; --speed 0
+applies writes as fast as possible, --batch-size writes at a time. Writes are
+applied in order, and after each batch the affected tournaments are rescored
+as POST /tournaments/{id}/rescore does it. (The API itself rescores only when
+asked to or when scoring rules change; replay rescores after every batch to
+measure what a rescore costs at that point in the gameweek.) The run prints
+score-update latency, leaderboard freshness and query counts.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import Gameweek, Match, PlayerMatchPerformance
+
+RECORDED_MODELS = {model.__tablename__: model for model in (Match, PlayerMatchPerformance)}
+
+
+# Recording
+
+class Recorder:
+    """Appends committed writes of RECORDED_MODELS to a JSON lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def install(self):
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def uninstall(self):
+        event.remove(Session, "after_flush", self._after_flush)
+        event.remove(Session, "after_commit", self._after_commit)
+        event.remove(Session, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session, flush_context):
+        pending = session.info.setdefault("replay_pending", [])
+        for op, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+            for obj in objects:
+                table = getattr(obj, "__tablename__", None)
+                if table not in RECORDED_MODELS:
+                    continue
+                if op == "update" and not session.is_modified(obj, include_collections=False):
+                    continue
+                pending.append({"table": table, "op": op, "row": _row(obj)})
+
+    def _after_commit(self, session):
+        self._append(session.info.pop("replay_pending", None))
+
+    def _append(self, pending):
+        if not pending:
+            return
+        now = time.time()
+        with self._lock, open(self.path, "a") as out:
+            for entry in pending:
+                self._seq += 1
+                out.write(json.dumps({"seq": self._seq, "ts": now, **entry}, default=_encode) + "\n")
+
+    def _after_rollback(self, session):
+        session.info.pop("replay_pending", None)
+
+    def record_updates(self, table: str, rows: list) -> None:
+        """Records updates committed outside the ORM session, e.g. by a write-behind buffer."""
+        self._append([{"table": table, "op": "update", "row": row} for row in rows])
+
+
+def _row(obj) -> dict:
+    # Only values already in memory: expired server defaults (created_at, ...) would need a query
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot record {type(value).__name__}")
+
+
+def start_recording(path: str) -> Recorder:
+    recorder = Recorder(path)
+    recorder.install()
+    return recorder
+
+
+# Replaying
+
+def load_recording(path: str) -> list:
+    with open(path) as recording:
+        events = [json.loads(line) for line in recording if line.strip()]
+    # Several API workers may append to one file; each numbers its own writes
+    return sorted(events, key=lambda entry: (entry["ts"], entry["seq"]))
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def replay(events: list, engine, speed: float = 1.0, rescore: bool = True, batch_size: int = 1) -> dict:
+    """Applies recorded writes in order at `speed` times real time and measures the scoring path.
+
+    Writes that are due at the same moment are applied together and then
+    scored once, the way a busy match day batches up. With speed 0 nothing
+    waits and writes go in batch_size at a time. Leaderboard freshness is the
+    time from when the oldest write in a batch was due (at speed 0: picked up)
+    until the rescored standings were committed.
+    """
+    import scoring
+
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    queries = QueryCounter(engine)
+    tournament_of_gameweek = {}
+    tournament_of_match = {}
+
+    score_latencies = []
+    freshness = []
+    write_queries = 0
+    score_queries = 0
+
+    start = time.perf_counter()
+    origin = events[0]["ts"] if events else 0.0
+    due_at = lambda entry: start + (entry["ts"] - origin) / speed
+
+    index = 0
+    while index < len(events):
+        if speed > 0:
+            due = due_at(events[index])
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            now = time.perf_counter()
+            batch = []
+            while index < len(events) and due_at(events[index]) <= now:
+                batch.append(events[index])
+                index += 1
+        else:
+            # As fast as possible: everything is already due, so a batch is just the next few writes
+            due = time.perf_counter()
+            batch = events[index:index + batch_size]
+            index += len(batch)
+
+        db = SessionLocal()
+        try:
+            before = queries.count
+            tournaments = set()
+            for entry in batch:
+                _apply(db, entry)
+                tournaments.add(_tournament_for(db, entry, tournament_of_match, tournament_of_gameweek))
+            db.commit()
+            write_queries += queries.count - before
+
+            if rescore:
+                before = queries.count
+                scored = time.perf_counter()
+                for tournament_id in tournaments - {None}:
+                    scoring.rescore_tournament(db, tournament_id)
+                done = time.perf_counter()
+                score_queries += queries.count - before
+                score_latencies.append(done - scored)
+                freshness.append(done - due)
+        finally:
+            db.close()
+
+    return {
+        "events": len(events),
+        "batches": len(score_latencies) if rescore else None,
+        "speed": speed,
+        "batch_size": batch_size if speed <= 0 else None,
+        "duration": time.perf_counter() - start,
+        "queries": queries.count,
+        "write_queries": write_queries,
+        "score_queries": score_queries,
+        "score_update_latency": _summary(score_latencies),
+        "leaderboard_freshness": _summary(freshness),
+    }
+
+
+def _apply(db: Session, entry: dict) -> None:
+    model = RECORDED_MODELS[entry["table"]]
+    row = dict(entry["row"])
+    if entry["op"] == "delete":
+        db.query(model).filter(model.id == row["id"]).delete(synchronize_session=False)
+        return
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime) and isinstance(row.get(column.key), str):
+            row[column.key] = datetime.fromisoformat(row[column.key])
+    db.merge(model(**row))
+    db.flush()
+
+
+def _tournament_for(db: Session, entry: dict, tournament_of_match: dict, tournament_of_gameweek: dict):
+    row = entry["row"]
+    if entry["table"] == Match.__tablename__:
+        match_id, gameweek_id = row["id"], row.get("gameweek_id")
+    else:
+        match_id = row.get("match_id")
+        if match_id is None:
+            # Write-behind updates only carry the columns that changed
+            match_id = db.query(PlayerMatchPerformance.match_id).filter(PlayerMatchPerformance.id == row["id"]).scalar()
+        if match_id in tournament_of_match:
+            return tournament_of_match[match_id]
+        gameweek_id = db.query(Match.gameweek_id).filter(Match.id == match_id).scalar()
+    if gameweek_id not in tournament_of_gameweek:
+        tournament_of_gameweek[gameweek_id] = db.query(Gameweek.tournament_id).filter(Gameweek.id == gameweek_id).scalar()
+    tournament_of_match[match_id] = tournament_of_gameweek[gameweek_id]
+    return tournament_of_match[match_id]
+
+
+def _summary(samples: list) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "max": ordered[-1], "mean": sum(ordered) / len(ordered)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Replay a recorded gameweek against a database.")
+    parser.add_argument("recording", help="JSON lines file written with REPLAY_RECORD_PATH")
+    parser.add_argument("--database-url", required=True, help="Database to replay into, never the production one")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier, 0 = as fast as possible")
+    parser.add_argument("--batch-size", type=int, default=1, help="Writes applied per rescore with --speed 0")
+    parser.add_argument("--no-rescore", action="store_true", help="Only apply the writes")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    report = replay(
+        load_recording(args.recording), create_engine(args.database_url), args.speed, not args.no_rescore, args.batch_size
+    )
+    print(json.dumps(report, indent=2))
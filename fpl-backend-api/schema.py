@@ -1,7 +1,7 @@
 # schemas.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict, Union
 
 
 # Tournament Schemas
@@ -295,3 +295,162 @@ class FantasyTeamGameweekScore(FantasyTeamGameweekScoreBase):
 
     class Config:
         orm_mode = True
+
+
+# MiniLeague Schemas
+class MiniLeagueBase(BaseModel):
+    name: str
+    tournament_id: int
+    format: Literal["classic", "h2h"] = "classic"
+    created_by: Optional[int] = None
+
+
+class MiniLeagueCreate(MiniLeagueBase):
+    pass
+
+
+class MiniLeague(MiniLeagueBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class MiniLeagueMemberCreate(BaseModel):
+    fantasy_team_id: int
+
+
+class MiniLeagueMember(MiniLeagueMemberCreate):
+    id: int
+    league_id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class HeadToHeadFixture(BaseModel):
+    id: int
+    league_id: int
+    gameweek_id: int
+    home_fantasy_team_id: int
+    away_fantasy_team_id: Optional[int] = None
+    home_points: Optional[float] = None
+    away_points: Optional[float] = None
+
+    class Config:
+        orm_mode = True
+
+
+class MiniLeagueStanding(BaseModel):
+    league_id: int
+    fantasy_team_id: int
+    rank: Optional[int] = None
+    total_points: float = 0.0
+    played: int = 0
+    won: int = 0
+    drawn: int = 0
+    lost: int = 0
+    league_points: int = 0
+
+    class Config:
+        orm_mode = True
+
+
+# Scoring rule Schemas
+# Position-dependent values accept either one number for every position or a
+# mapping like {"Goalkeeper": 6, "Defender": 6, "Midfielder": 5, "Forward": 4}.
+PositionPoints = Union[float, Dict[str, float]]
+
+
+class ScoringRules(BaseModel):
+    minutes_threshold: int = 60  # Minutes needed for the full appearance points and clean sheet points
+    appearance_points: float = 1.0  # Any minutes played
+    full_appearance_points: float = 2.0  # Minutes played >= minutes_threshold
+    goal_points: PositionPoints = {"Goalkeeper": 6.0, "Defender": 6.0, "Midfielder": 5.0, "Forward": 4.0}
+    assist_points: PositionPoints = 3.0
+    clean_sheet_points: PositionPoints = {"Goalkeeper": 4.0, "Defender": 4.0, "Midfielder": 1.0, "Forward": 0.0}
+    yellow_card_points: float = -1.0
+    red_card_points: float = -3.0
+    own_goal_points: float = -2.0
+    captain_multiplier: float = 2.0
+
+
+class ScoringRuleSet(BaseModel):
+    tournament_id: int
+    version: int
+    rules: ScoringRules
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+# Season statistics Schemas (read from materialized views)
+class TeamStanding(BaseModel):
+    tournament_id: int
+    team_id: int
+    team_name: str
+    played: int
+    won: int
+    drawn: int
+    lost: int
+    goals_for: int
+    goals_against: int
+    goal_difference: int
+    points: int
+
+
+class PlayerSeasonTotals(BaseModel):
+    tournament_id: int
+    player_id: int
+    player_name: str
+    team_id: int
+    position: str
+    appearances: int
+    minutes_played: int
+    goals: int
+    assists: int
+    clean_sheets: int
+    yellow_cards: int
+    red_cards: int
+    own_goals: int
+
+
+# Dashboard Schemas
+class DashboardFantasyTeam(BaseModel):
+    id: int
+    name: Optional[str] = None
+    tournament_id: int
+    latest_gameweek_id: Optional[int] = None
+    latest_gameweek_points: Optional[float] = None
+    total_points: float = 0.0
+    rank: Optional[int] = None
+
+
+class DashboardMatch(BaseModel):
+    id: int
+    tournament_id: int
+    gameweek_id: int
+    home_team_id: int
+    away_team_id: int
+    start_time: Optional[datetime] = None
+
+
+class UserDashboard(BaseModel):
+    user_id: int
+    fantasy_teams: List[DashboardFantasyTeam]
+    upcoming_matches: List[DashboardMatch]
+
+
+# Auth Schemas
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
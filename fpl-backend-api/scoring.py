@@ -0,0 +1,239 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import dashboard
+import leagues
+import schema
+from database import (
+    FantasyTeam,
+    FantasyTeamGameweekScore,
+    FantasyTeamPlayer,
+    Gameweek,
+    Match,
+    Player,
+    PlayerMatchPerformance,
+    ScoringRuleSet,
+)
+
+
+class CompiledRules:
+    """A rule set compiled into one bulk scoring pass over column arrays.
+
+    All rule lookups happen once here; score() itself only does arithmetic on
+    the columns of many PlayerMatchPerformance rows at a time.
+    """
+
+    def __init__(self, rules: dict):
+        rules = schema.ScoringRules(**(rules or {}))
+        self.rules = rules
+        self.captain_multiplier = rules.captain_multiplier
+
+        positions = set()
+        for value in (rules.goal_points, rules.assist_points, rules.clean_sheet_points):
+            if isinstance(value, dict):
+                positions.update(value)
+        # (goal, assist, clean sheet) points per position, plus the fallback for unknown positions
+        self._by_position = {position: self._position_points(position) for position in positions}
+        self._default = self._position_points(None)
+
+    def _position_points(self, position):
+        def lookup(value):
+            return value.get(position, 0.0) if isinstance(value, dict) else value
+        rules = self.rules
+        return lookup(rules.goal_points), lookup(rules.assist_points), lookup(rules.clean_sheet_points)
+
+    def score(
+        self,
+        position: Sequence[str],
+        minutes_played: Sequence[int],
+        goals: Sequence[int],
+        assists: Sequence[int],
+        clean_sheet: Sequence[bool],
+        yellow_cards: Sequence[int],
+        red_cards: Sequence[int],
+        own_goals: Sequence[int],
+    ) -> List[float]:
+        """Scores rows given column-wise, returning one points value per row."""
+        rules = self.rules
+        threshold = rules.minutes_threshold
+        appearance = rules.appearance_points
+        full_appearance = rules.full_appearance_points
+        yellow = rules.yellow_card_points
+        red = rules.red_card_points
+        own_goal = rules.own_goal_points
+        by_position = self._by_position.get
+        default = self._default
+
+        points = []
+        append = points.append
+        for pos, minutes, g, a, cs, y, r, og in zip(
+            position, minutes_played, goals, assists, clean_sheet, yellow_cards, red_cards, own_goals
+        ):
+            goal_points, assist_points, clean_sheet_points = by_position(pos, default)
+            if minutes >= threshold:
+                total = full_appearance + (clean_sheet_points if cs else 0.0)
+            elif minutes > 0:
+                total = appearance
+            else:
+                total = 0.0
+            append(total + g * goal_points + a * assist_points + y * yellow + r * red + og * own_goal)
+        return points
+
+
+def _squad_points(squad, player_points: dict, captain_multiplier: float) -> dict:
+    """Points per player of a fantasy team's squad for one gameweek, keyed by player id as a string.
+
+    squad is (player_id, is_captain) pairs; players who didn't play are left out.
+    """
+    breakdown = {}
+    for player_id, is_captain in squad:
+        if player_id in player_points:
+            multiplier = captain_multiplier if is_captain else 1
+            breakdown[str(player_id)] = player_points[player_id] * multiplier
+    return breakdown
+
+
+_evaluators: Dict[int, tuple] = {}  # tournament_id -> (version, CompiledRules)
+_evaluators_lock = threading.Lock()
+
+
+def get_rule_set(db: Session, tournament_id: int) -> Optional[ScoringRuleSet]:
+    return db.query(ScoringRuleSet).filter(ScoringRuleSet.tournament_id == tournament_id).first()
+
+
+def get_evaluator(db: Session, tournament_id: int) -> CompiledRules:
+    """Returns the compiled rules for a tournament, compiling only when the rule version changed."""
+    rule_set = get_rule_set(db, tournament_id)
+    version = rule_set.version if rule_set is not None else 0  # 0 = built-in default rules
+    with _evaluators_lock:
+        cached = _evaluators.get(tournament_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    evaluator = CompiledRules(rule_set.rules if rule_set is not None else None)
+    with _evaluators_lock:
+        _evaluators[tournament_id] = (version, evaluator)
+    return evaluator
+
+
+def set_rules(db: Session, tournament_id: int, rules: schema.ScoringRules) -> ScoringRuleSet:
+    """Stores a new version of a tournament's rules and rescores the whole tournament with it."""
+    rule_set = get_rule_set(db, tournament_id)
+    if rule_set is None:
+        rule_set = ScoringRuleSet(tournament_id=tournament_id, version=1, rules=rules.dict())
+        db.add(rule_set)
+    else:
+        rule_set.rules = rules.dict()
+        rule_set.version = rule_set.version + 1
+    db.commit()
+    db.refresh(rule_set)
+    rescore_tournament(db, tournament_id)
+    return rule_set
+
+
+def rescore_tournament(db: Session, tournament_id: int) -> int:
+    """Recomputes every FantasyTeamGameweekScore of a tournament. Returns the number of scores changed."""
+    evaluator = get_evaluator(db, tournament_id)
+
+    # One query for every performance of the tournament, already in column form for the evaluator.
+    rows = (
+        db.query(
+            Match.gameweek_id,
+            PlayerMatchPerformance.player_id,
+            Player.position,
+            func.coalesce(PlayerMatchPerformance.minutes_played, 0),
+            func.coalesce(PlayerMatchPerformance.goals, 0),
+            func.coalesce(PlayerMatchPerformance.assists, 0),
+            func.coalesce(PlayerMatchPerformance.clean_sheet, False),
+            func.coalesce(PlayerMatchPerformance.yellow_cards, 0),
+            func.coalesce(PlayerMatchPerformance.red_cards, 0),
+            func.coalesce(PlayerMatchPerformance.own_goals, 0),
+        )
+        .join(Match, Match.id == PlayerMatchPerformance.match_id)
+        .join(Gameweek, Gameweek.id == Match.gameweek_id)
+        .join(Player, Player.id == PlayerMatchPerformance.player_id)
+        .filter(Gameweek.tournament_id == tournament_id)
+        .all()
+    )
+    if not rows:
+        return 0
+    gameweek_ids, player_ids, *stat_columns = zip(*rows)
+    points = evaluator.score(*stat_columns)
+
+    # Points per player per gameweek; a player can play more than one match in a gameweek.
+    player_gameweek_points = defaultdict(dict)
+    for gameweek_id, player_id, value in zip(gameweek_ids, player_ids, points):
+        per_player = player_gameweek_points[gameweek_id]
+        per_player[player_id] = per_player.get(player_id, 0.0) + value
+
+    squads = defaultdict(list)
+    squad_rows = (
+        db.query(FantasyTeamPlayer.fantasy_team_id, FantasyTeamPlayer.player_id, FantasyTeamPlayer.is_captain)
+        .join(FantasyTeam, FantasyTeam.id == FantasyTeamPlayer.fantasy_team_id)
+        .filter(FantasyTeam.tournament_id == tournament_id)
+    )
+    for fantasy_team_id, player_id, is_captain in squad_rows:
+        squads[fantasy_team_id].append((player_id, is_captain))
+
+    existing = {
+        (score.fantasy_team_id, score.gameweek_id): score
+        for score in db.query(FantasyTeamGameweekScore).filter(
+            FantasyTeamGameweekScore.fantasy_team_id.in_(list(squads))
+        )
+    }
+
+    changed = []
+    for gameweek_id, per_player in player_gameweek_points.items():
+        for fantasy_team_id, squad in squads.items():
+            breakdown = _squad_points(squad, per_player, evaluator.captain_multiplier)
+            total = sum(breakdown.values())
+
+            score = existing.get((fantasy_team_id, gameweek_id))
+            if score is None:
+                score = FantasyTeamGameweekScore(fantasy_team_id=fantasy_team_id, gameweek_id=gameweek_id)
+                db.add(score)
+            elif score.total_points == total and score.player_points == breakdown:
+                continue
+            score.total_points = total
+            score.player_points = breakdown
+            changed.append(score)
+
+    # Standings follow in the same transaction, each league re-ranked once however many scores moved
+    leagues.apply_gameweek_scores(db, changed)
+    db.commit()
+    if changed:
+        dashboard.tournament_scores_changed(tournament_id, {score.gameweek_id for score in changed})
+    return len(changed)
+
+
+if __name__ == '__main__':
+    # Scoring throughput benchmark: python scoring.py [rows]
+    import random
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    positions = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
+    columns = (
+        [rng.choice(positions) for _ in range(n)],
+        [rng.choice((0, 30, 60, 90)) for _ in range(n)],
+        [rng.choice((0, 0, 0, 1, 2)) for _ in range(n)],
+        [rng.choice((0, 0, 0, 1)) for _ in range(n)],
+        [rng.random() < 0.3 for _ in range(n)],
+        [rng.choice((0, 0, 0, 1)) for _ in range(n)],
+        [int(rng.random() < 0.02) for _ in range(n)],
+        [int(rng.random() < 0.01) for _ in range(n)],
+    )
+
+    start = time.perf_counter()
+    evaluator = CompiledRules(None)
+    compiled = time.perf_counter()
+    evaluator.score(*columns)
+    scored = time.perf_counter()
+
+    print(f"Compiled rules in {(compiled - start) * 1000:.2f} ms")
+    print(f"Scored {n} rows in {scored - compiled:.3f} s ({n / (scored - compiled):,.0f} rows/s)")
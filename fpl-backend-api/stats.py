@@ -0,0 +1,116 @@
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Season aggregates kept as Postgres materialized views so that standings and
+# leaderboard pages are a single indexed read. Only finished matches count.
+# Every view has a unique index, which REFRESH ... CONCURRENTLY requires.
+VIEWS = {
+    "team_standings": """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS team_standings AS
+        WITH results AS (
+            SELECT g.tournament_id, m.home_team_id AS team_id, m.home_score AS goals_for, m.away_score AS goals_against
+            FROM matches m JOIN gameweeks g ON g.id = m.gameweek_id
+            WHERE m.is_finished AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
+            UNION ALL
+            SELECT g.tournament_id, m.away_team_id, m.away_score, m.home_score
+            FROM matches m JOIN gameweeks g ON g.id = m.gameweek_id
+            WHERE m.is_finished AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
+        ),
+        totals AS (
+            SELECT t.tournament_id, t.id AS team_id, t.name AS team_name,
+                   COUNT(r.team_id) AS played,
+                   COUNT(*) FILTER (WHERE r.goals_for > r.goals_against) AS won,
+                   COUNT(*) FILTER (WHERE r.goals_for = r.goals_against) AS drawn,
+                   COUNT(*) FILTER (WHERE r.goals_for < r.goals_against) AS lost,
+                   COALESCE(SUM(r.goals_for), 0) AS goals_for,
+                   COALESCE(SUM(r.goals_against), 0) AS goals_against
+            FROM teams t LEFT JOIN results r ON r.team_id = t.id AND r.tournament_id = t.tournament_id
+            GROUP BY t.tournament_id, t.id, t.name
+        )
+        SELECT *, goals_for - goals_against AS goal_difference, 3 * won + drawn AS points
+        FROM totals
+    """,
+    "player_season_totals": """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS player_season_totals AS
+        SELECT g.tournament_id, p.id AS player_id, p.name AS player_name, p.team_id, p.position,
+               COUNT(*) FILTER (WHERE pmp.minutes_played > 0) AS appearances,
+               COALESCE(SUM(pmp.minutes_played), 0) AS minutes_played,
+               COALESCE(SUM(pmp.goals), 0) AS goals,
+               COALESCE(SUM(pmp.assists), 0) AS assists,
+               COUNT(*) FILTER (WHERE pmp.clean_sheet) AS clean_sheets,
+               COALESCE(SUM(pmp.yellow_cards), 0) AS yellow_cards,
+               COALESCE(SUM(pmp.red_cards), 0) AS red_cards,
+               COALESCE(SUM(pmp.own_goals), 0) AS own_goals
+        FROM player_match_performances pmp
+        JOIN matches m ON m.id = pmp.match_id
+        JOIN gameweeks g ON g.id = m.gameweek_id
+        JOIN players p ON p.id = pmp.player_id
+        WHERE m.is_finished
+        GROUP BY g.tournament_id, p.id, p.name, p.team_id, p.position
+    """,
+}
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_team_standings ON team_standings (tournament_id, team_id)",
+    "CREATE INDEX IF NOT EXISTS ix_team_standings_table ON team_standings "
+    "(tournament_id, points DESC, goal_difference DESC, goals_for DESC)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_player_season_totals ON player_season_totals (tournament_id, player_id)",
+    "CREATE INDEX IF NOT EXISTS ix_player_season_totals_goals ON player_season_totals (tournament_id, goals DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_player_season_totals_assists ON player_season_totals (tournament_id, assists DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_player_season_totals_clean_sheets ON player_season_totals "
+    "(tournament_id, clean_sheets DESC)",
+]
+
+# Leaderboards that can be served from player_season_totals, each backed by an index above
+LEADERBOARD_STATS = ("goals", "assists", "clean_sheets")
+
+
+def create_views(engine) -> None:
+    """Creates the materialized views and their indexes if they do not exist yet."""
+    with engine.begin() as conn:
+        for ddl in VIEWS.values():
+            conn.execute(text(ddl))
+        for ddl in INDEXES:
+            conn.execute(text(ddl))
+
+
+def refresh_views() -> None:
+    """Refreshes every view without blocking readers. Meant to run as a background task."""
+    try:
+        with database.engine.begin() as conn:
+            for name in VIEWS:
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+    except Exception:
+        # The old snapshot keeps being served; the next finished match refreshes again.
+        logger.exception("Refreshing season statistics failed")
+
+
+def get_team_standings(db: Session, tournament_id: int) -> List[dict]:
+    rows = db.execute(
+        text(
+            "SELECT * FROM team_standings WHERE tournament_id = :tournament_id "
+            "ORDER BY points DESC, goal_difference DESC, goals_for DESC"
+        ),
+        {"tournament_id": tournament_id},
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def get_leaders(db: Session, tournament_id: int, stat: str, limit: int = 10, position: Optional[str] = None) -> List[dict]:
+    """Top players of a tournament by one of LEADERBOARD_STATS, optionally for one position."""
+    if stat not in LEADERBOARD_STATS:
+        raise ValueError(f"Unknown statistic: {stat}")
+    query = f"SELECT * FROM player_season_totals WHERE tournament_id = :tournament_id AND {stat} > 0"
+    params = {"tournament_id": tournament_id, "limit": limit}
+    if position is not None:
+        query += " AND position = :position"
+        params["position"] = position
+    query += f" ORDER BY {stat} DESC, player_id LIMIT :limit"
+    return [dict(row._mapping) for row in db.execute(text(query), params)]
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# A scratch Postgres database for the tests that need real locking, e.g.
+# postgresql://postgres@localhost/fpl_test. Those tests drop and recreate
+# everything in it, and are skipped when it isn't set.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def postgres_url():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return TEST_DATABASE_URL
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from cache import FragmentCache
+
+
+def test_hit_after_load():
+    cache = FragmentCache()
+    loads = []
+    assert cache.get_or_load("k", ["t"], lambda: loads.append(1) or "v") == "v"
+    assert cache.get_or_load("k", ["t"], lambda: loads.append(1) or "other") == "v"
+    assert len(loads) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_drops_only_entries_with_the_tag():
+    cache = FragmentCache()
+    cache.get_or_load("a", ["t1"], lambda: 1)
+    cache.get_or_load("b", ["t1", "t2"], lambda: 2)
+    cache.get_or_load("c", ["t2"], lambda: 3)
+    cache.invalidate("t1")
+    assert cache.get_or_load("a", ["t1"], lambda: 10) == 10
+    assert cache.get_or_load("b", ["t1", "t2"], lambda: 20) == 20
+    assert cache.get_or_load("c", ["t2"], lambda: 30) == 3
+
+
+def test_invalidation_during_load_is_not_cached():
+    # A write that lands while a fragment is being built may not be in it, so it must not be kept
+    cache = FragmentCache()
+
+    def load():
+        cache.invalidate("t")
+        return "stale"
+
+    assert cache.get_or_load("k", ["t"], load) == "stale"
+    assert cache.get_or_load("k", ["t"], lambda: "fresh") == "fresh"
+    assert cache.get_or_load("k", ["t"], lambda: "newer") == "fresh"
+
+
+def test_invalidating_another_tag_during_load_keeps_the_entry():
+    cache = FragmentCache()
+
+    def load():
+        cache.invalidate("unrelated")
+        return "v"
+
+    cache.get_or_load("k", ["t"], load)
+    assert cache.get_or_load("k", ["t"], lambda: "other") == "v"
+
+
+def test_none_is_not_cached():
+    cache = FragmentCache()
+    assert cache.get_or_load("k", ["t"], lambda: None) is None
+    assert cache.get_or_load("k", ["t"], lambda: "created") == "created"
+
+
+def test_expired_entries_reload():
+    cache = FragmentCache()
+    cache.get_or_load("k", ["t"], lambda: "old", ttl=0)
+    assert cache.get_or_load("k", ["t"], lambda: "new") == "new"
+
+
+def test_oldest_entries_are_evicted():
+    cache = FragmentCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_load(key, ["t"], lambda key=key: key)
+    assert cache.get_or_load("a", ["t"], lambda: "reloaded") == "reloaded"
+    assert cache.get_or_load("c", ["t"], lambda: "reloaded") == "c"
+
+
+def test_concurrent_misses_share_one_load():
+    cache = FragmentCache()
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        started.set()
+        release.wait(5)
+        return "v"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_load("k", ["t"], load)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_load("k", ["t"], load)))
+    second.start()
+    while cache.misses < 2:  # The second caller missed too and is now waiting on the first load
+        time.sleep(0.001)
+    release.set()
+    first.join()
+    second.join()
+    assert results == ["v", "v"]
+    assert len(loads) == 1
@@ -0,0 +1,118 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import leagues
+import schema
+from database import Base, FantasyTeam, Gameweek, MiniLeagueStanding, Tournament, User
+
+ROUNDS = 20
+
+
+@pytest.fixture
+def session_factory(postgres_url):
+    engine = create_engine(postgres_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_concurrent_score_updates_in_one_league(session_factory):
+    # Two teams swapping places at the same moment, as on match day: each update
+    # re-ranks the whole league, which deadlocked or left stale ranks before leagues were locked.
+    db = session_factory()
+    tournament = Tournament(name="Cup", start_date=datetime(2025, 1, 1), end_date=datetime(2025, 6, 1))
+    user = User(username="owner", email="owner@example.com")
+    db.add_all([tournament, user])
+    db.flush()
+    teams = [FantasyTeam(name=name, user_id=user.id, tournament_id=tournament.id) for name in ("A", "B")]
+    gameweek = Gameweek(name="GW1", tournament_id=tournament.id, start_date=datetime(2025, 1, 1))
+    db.add_all(teams + [gameweek])
+    db.commit()
+    league = leagues.create_league(db, schema.MiniLeagueCreate(name="Office", tournament_id=tournament.id))
+    scores = {}
+    for team, points in zip(teams, (10.0, 5.0)):
+        leagues.add_member(db, league, team)
+        score = schema.FantasyTeamGameweekScoreCreate(fantasy_team_id=team.id, gameweek_id=gameweek.id, total_points=points)
+        scores[team.id] = leagues.create_gameweek_score(db, score).id
+    team_ids = [team.id for team in teams]
+    league_id = league.id
+    db.close()
+
+    errors = []
+
+    def update(score_id, points, barrier):
+        session = session_factory()
+        try:
+            barrier.wait()
+            leagues.update_gameweek_score(session, score_id, schema.FantasyTeamGameweekScoreUpdate(total_points=points))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            session.close()
+
+    for round_number in range(ROUNDS):
+        a_points, b_points = (1.0, 20.0) if round_number % 2 == 0 else (10.0, 5.0)
+        barrier = threading.Barrier(2)
+        threads = [
+            threading.Thread(target=update, args=(scores[team_ids[0]], a_points, barrier)),
+            threading.Thread(target=update, args=(scores[team_ids[1]], b_points, barrier)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+
+        db = session_factory()
+        standings = {s.fantasy_team_id: s for s in db.query(MiniLeagueStanding).filter_by(league_id=league_id)}
+        db.close()
+        assert standings[team_ids[0]].total_points == a_points
+        assert standings[team_ids[1]].total_points == b_points
+        leader = team_ids[0] if a_points > b_points else team_ids[1]
+        assert standings[leader].rank == 1
+
+
+def _standing(team_id, total_points, league_points=0):
+    return MiniLeagueStanding(fantasy_team_id=team_id, total_points=total_points, league_points=league_points)
+
+
+def test_rank_ties_share_a_rank_and_skip_the_next():
+    standings = [_standing(1, 40.0), _standing(2, 55.0), _standing(3, 40.0), _standing(4, 12.0)]
+    leagues._rank(standings, leagues.CLASSIC)
+    assert [(s.fantasy_team_id, s.rank) for s in standings] == [(2, 1), (1, 2), (3, 2), (4, 4)]
+
+
+def test_rank_h2h_orders_by_league_points_then_total():
+    standings = [_standing(1, 90.0, league_points=3), _standing(2, 50.0, league_points=6), _standing(3, 60.0, league_points=3)]
+    leagues._rank(standings, leagues.HEAD_TO_HEAD)
+    assert [(s.fantasy_team_id, s.rank) for s in standings] == [(2, 1), (1, 2), (3, 3)]
+
+
+def test_round_robin_with_odd_member_count():
+    teams = [11, 12, 13, 14, 15]
+    rounds = [leagues._round_robin_pairs(teams, round_number) for round_number in range(len(teams))]
+
+    met = set()
+    for pairs in rounds:
+        # Every team plays or has the bye exactly once per round, and exactly one team has the bye
+        assert sorted(team for pair in pairs for team in pair if team is not None) == teams
+        byes = [home for home, away in pairs if away is None]
+        assert len(byes) == 1
+        met.update(frozenset(pair) for pair in pairs if None not in pair)
+    # Over a full cycle everyone meets everyone else once, and everyone sits out once
+    assert len(met) == len(teams) * (len(teams) - 1) // 2
+    assert sorted(home for pairs in rounds for home, away in pairs if away is None) == teams
+    assert teams == [11, 12, 13, 14, 15]  # The caller's list isn't padded with the bye
+
+
+def test_round_robin_pairs_change_every_round():
+    teams = [1, 2, 3, 4]
+    first, second = leagues._round_robin_pairs(teams, 0), leagues._round_robin_pairs(teams, 1)
+    assert {frozenset(pair) for pair in first}.isdisjoint(frozenset(pair) for pair in second)
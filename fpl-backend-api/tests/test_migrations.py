@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import threading
+
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+from conftest import APP_DIR
+from migrations.helpers import backfill_in_batches
+
+INSTANCES = 3
+
+
+def test_concurrent_upgrades(postgres_url):
+    # Every instance runs `upgrade head` on startup. Starting from 0001, the later
+    # revisions build indexes concurrently while the other instances wait their turn.
+    engine = create_engine(postgres_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    env = {**os.environ, "DATABASE_URL": postgres_url}
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "0001"], cwd=APP_DIR, env=env, check=True, capture_output=True
+    )
+
+    upgrades = [
+        subprocess.Popen(
+            [sys.executable, "-c", "import database; database.init_schema()"],
+            cwd=APP_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(INSTANCES)
+    ]
+    for upgrade in upgrades:
+        _, stderr = upgrade.communicate(timeout=120)
+        assert upgrade.returncode == 0, stderr
+
+    head = ScriptDirectory.from_config(Config(os.path.join(APP_DIR, "alembic.ini"))).get_current_head()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+    engine.dispose()
+
+
+def test_backfill_waits_for_locked_rows(postgres_url):
+    engine = create_engine(postgres_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS backfill_test"))
+        conn.execute(text("CREATE TABLE backfill_test (id serial PRIMARY KEY, value integer)"))
+        conn.execute(text("INSERT INTO backfill_test (value) SELECT NULL FROM generate_series(1, 10)"))
+
+    # A live request holds one row for a moment; the backfill must wait for it rather than stop early.
+    holder = engine.connect()
+    holder.execute(text("SELECT id FROM backfill_test WHERE id = 5 FOR UPDATE"))
+    release = threading.Timer(0.5, holder.commit)
+    release.start()
+    try:
+        with engine.connect() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                updated = backfill_in_batches("backfill_test", "value = 1", "value IS NULL", batch_size=3, locked_pause=0.1)
+    finally:
+        release.join()
+        holder.close()
+
+    assert updated == 10
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT count(*) FROM backfill_test WHERE value IS NULL")).scalar() == 0
+        conn.execute(text("DROP TABLE backfill_test"))
+    engine.dispose()
@@ -0,0 +1,49 @@
+import pytest
+
+from scoring import CompiledRules, _squad_points
+
+
+def _score(rules, position, minutes, goals=0, assists=0, clean_sheet=False, yellow=0, red=0, own_goals=0):
+    return rules.score([position], [minutes], [goals], [assists], [clean_sheet], [yellow], [red], [own_goals])[0]
+
+
+def test_minutes_threshold():
+    rules = CompiledRules({"minutes_threshold": 60})
+    assert _score(rules, "Defender", 0, clean_sheet=True) == 0.0
+    assert _score(rules, "Defender", 59, clean_sheet=True) == 1.0  # Appearance only, no clean sheet
+    assert _score(rules, "Defender", 60, clean_sheet=True) == 2.0 + 4.0  # Full appearance and clean sheet
+    assert _score(rules, "Defender", 90) == 2.0
+
+
+def test_points_by_position():
+    rules = CompiledRules(None)
+    assert _score(rules, "Forward", 90, goals=2, assists=1) == 2.0 + 2 * 4.0 + 3.0
+    assert _score(rules, "Midfielder", 90, goals=1, clean_sheet=True) == 2.0 + 5.0 + 1.0
+    assert _score(rules, "Goalkeeper", 90, yellow=1, red=1, own_goals=1) == 2.0 - 1.0 - 3.0 - 2.0
+
+
+def test_unknown_position_gets_only_flat_points():
+    # Per-position values have no entry for it, so they count 0; flat values still apply
+    rules = CompiledRules({"goal_points": {"Forward": 4.0}, "assist_points": 3.0})
+    assert _score(rules, "Wing-back", 90, goals=1, assists=1, clean_sheet=True) == 2.0 + 0.0 + 3.0 + 0.0
+    assert _score(rules, None, 30, goals=1) == 1.0
+
+
+def test_score_is_one_value_per_row():
+    rules = CompiledRules(None)
+    points = rules.score(
+        ["Forward", "Defender"], [90, 0], [1, 0], [0, 0], [False, True], [0, 0], [0, 0], [0, 0]
+    )
+    assert points == [6.0, 0.0]
+
+
+def test_captain_multiplier():
+    rules = CompiledRules({"captain_multiplier": 3.0})
+    squad = [(1, True), (2, False), (3, False)]  # Player 3 didn't play
+    breakdown = _squad_points(squad, {1: 5.0, 2: 4.0}, rules.captain_multiplier)
+    assert breakdown == {"1": 15.0, "2": 4.0}
+
+
+@pytest.mark.parametrize("captain_multiplier", [1.0, 2.0])
+def test_captain_without_points_adds_nothing(captain_multiplier):
+    assert _squad_points([(7, True)], {}, captain_multiplier) == {}
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from conftest import APP_DIR
+
+# New instances should serve traffic within a second. Importing main measured 0.7-0.9 s,
+# nearly all of it fastapi, pydantic and sqlalchemy, so work creeping back into import
+# time (a database connection, eager imports of heavy modules) fails this.
+IMPORT_BUDGET = 1.0  # Seconds
+# Best of a few runs, since a busy machine only ever adds time
+RUNS = 3
+
+# Nothing listens here: an import that tries to connect fails or stalls past the budget.
+UNREACHABLE_DATABASE_URL = "postgresql://hillsidefpl@127.0.0.1:1/unreachable"
+
+MEASURE_IMPORT = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+
+def test_import_main_within_budget(tmp_path):
+    # main imports crud, which isn't part of this tree; an empty one is enough to import it.
+    (tmp_path / "crud.py").write_text("")
+    timings = []
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE_IMPORT],
+            cwd=APP_DIR,
+            env={**os.environ, "DATABASE_URL": UNREACHABLE_DATABASE_URL, "PYTHONPATH": str(tmp_path)},
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert result.returncode == 0, result.stderr
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+
+    seconds = min(timings)
+    assert seconds < IMPORT_BUDGET, f"importing main took {seconds:.2f} s, budget is {IMPORT_BUDGET} s"
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy.exc import DataError
+
+import writebehind
+from database import PlayerMatchPerformance
+
+
+@pytest.fixture
+def buffer():
+    # Writes are recorded instead of sent to a database, and only explicit flushes run
+    buffer = writebehind.WriteBehindBuffer(PlayerMatchPerformance, window=3600)
+    buffer._validate = lambda db, row_id, changes: None
+    buffer.writes = []
+    buffer._write = lambda pending: buffer.writes.append({row_id: dict(changes) for row_id, changes in pending.items()})
+    yield buffer
+    buffer._stop.set()
+
+
+def test_updates_to_a_row_coalesce(buffer):
+    buffer.submit(None, 1, {"goals": 1})
+    buffer.submit(None, 1, {"assists": 2})
+    buffer.submit(None, 1, {"goals": 3})
+    buffer.submit(None, 2, {"minutes_played": 45})
+    assert buffer.pending(1) == {"goals": 3, "assists": 2}
+
+    assert buffer.flush() == 2
+    assert buffer.writes == [{1: {"goals": 3, "assists": 2}, 2: {"minutes_played": 45}}]
+    assert buffer.submitted == 4
+    assert buffer.pending(1) == {}
+    assert buffer.flush() == 0
+
+
+def test_requeue_keeps_newer_updates_on_top(buffer):
+    buffer.submit(None, 1, {"goals": 5})
+    buffer._requeue({1: {"goals": 1, "assists": 1}, 2: {"goals": 2}})
+    assert buffer.pending(1) == {"goals": 5, "assists": 1}
+    assert buffer.pending(2) == {"goals": 2}
+
+
+def test_failed_flush_requeues_under_updates_submitted_meanwhile(buffer):
+    buffer.submit(None, 1, {"goals": 1, "assists": 2})
+
+    def unreachable(pending):
+        buffer.submit(None, 1, {"goals": 2})  # Arrives while the write is in flight
+        raise ConnectionError("database unreachable")
+
+    buffer._write = unreachable
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    assert buffer.pending(1) == {"goals": 2, "assists": 2}
+
+
+def test_rejected_row_is_retried_then_dropped(buffer):
+    def write(pending):
+        if 2 in pending:
+            raise DataError("UPDATE", {}, Exception("value out of range"))
+        buffer.writes.append(dict(pending))
+
+    buffer._write = write
+    flushed = []
+    buffer.listeners.append(flushed.append)
+    buffer.submit(None, 1, {"goals": 1})
+    buffer.submit(None, 2, {"goals": 2})
+
+    # The good row lands on the first flush; the bad one is retried on the next ones
+    assert buffer.flush() == 1
+    assert buffer.writes == [{1: {"goals": 1}}]
+    assert flushed == [[{"id": 1, "goals": 1}]]
+    for _ in range(writebehind.MAX_ATTEMPTS - 1):
+        assert buffer.pending(2) == {"goals": 2}
+        buffer.flush()
+    assert buffer.pending(2) == {}
+    assert list(buffer.dropped) == [{"id": 2, "goals": 2}]
@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+
+from sqlalchemy import Integer, cast, column, func, select, update, values
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Updates to the same row within this many seconds are merged into one write.
+WINDOW = float(os.environ.get("WRITE_BEHIND_WINDOW", "0.25"))
+# A row the database keeps rejecting is dropped after this many flushes instead of blocking the rest.
+MAX_ATTEMPTS = 3
+INT_MIN, INT_MAX = -2**31, 2**31 - 1  # Postgres integer
+# Buffers live in one process's memory and flush() only writes that process's, so with
+# several workers a rescore or an explicit flush on one can miss updates another still
+# holds. Buffering is therefore off when more than one worker is configured (WEB_CONCURRENCY,
+# read by uvicorn and gunicorn), and buffered writes go straight to the database. Set
+# WRITE_BEHIND_ENABLED=0 as well when several instances serve the app, or set it to 1 only
+# where buffered writes and everything that flushes reach a single process.
+ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "1" if int(os.environ.get("WEB_CONCURRENCY", "1")) <= 1 else "0") == "1"
+
+
+class WriteBehindBuffer:
+    """Coalesces high-frequency updates of one model and writes them in bulk.
+
+    submit() only records the new column values in memory. Every `window`
+    seconds a background thread writes everything pending in one transaction,
+    as one multi-row UPDATE ... FROM (VALUES ...) per set of changed columns,
+    so the commit rate stays flat however fast updates arrive. Callers that
+    must see their writes in the database call flush() first.
+
+    If a batch is rejected, its rows are written one at a time so one bad
+    update can't hold back the others.
+
+    Pending updates are only in this process: flush() doesn't reach other
+    workers or instances, which is why callers check ENABLED first.
+    """
+
+    def __init__(self, model, window: float = WINDOW):
+        self.model = model
+        self.window = window
+        self.listeners = []  # Called with the flushed rows after each commit
+        self._pending = {}  # row id -> {column: value}
+        self._attempts = {}  # row id -> flushes the database rejected it in
+        self.dropped = deque(maxlen=1000)  # Updates given up on after MAX_ATTEMPTS, newest last
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.submitted = 0
+        self.commits = 0
+
+    def submit(self, db: Session, row_id: int, changes: dict) -> None:
+        """Queues an update after checking that it can be written.
+
+        Raises LookupError if the row or a row it references doesn't exist,
+        and ValueError for a value the column can't hold.
+        """
+        if not changes:
+            return
+        self._validate(db, row_id, changes)
+        with self._lock:
+            self._pending.setdefault(row_id, {}).update(changes)
+            self.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.model.__tablename__}", daemon=True)
+                self._thread.start()
+
+    def pending(self, row_id: int) -> dict:
+        """Changes for a row that are not in the database yet."""
+        with self._lock:
+            return dict(self._pending.get(row_id, {}))
+
+    def flush(self) -> int:
+        """Writes everything pending now and returns the number of rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+                written = pending
+            except (DataError, IntegrityError):
+                logger.warning("Write-behind batch of %d %s rows rejected, writing them one by one", len(pending), self.model.__tablename__)
+                written = self._write_rows(pending)
+            except Exception:
+                # Not the data's fault (e.g. the database is unreachable): keep everything for the next flush
+                self._requeue(pending)
+                raise
+            for row_id in written:
+                self._attempts.pop(row_id, None)
+            rows = [{"id": row_id, **changes} for row_id, changes in written.items()]
+            for listener in self.listeners:
+                try:
+                    listener(rows)
+                except Exception:
+                    logger.exception("Write-behind listener failed")
+            return len(rows)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush of %s failed, retrying", self.model.__tablename__)
+
+    def _write_rows(self, pending: dict) -> dict:
+        written = {}
+        for index, (row_id, changes) in enumerate(pending.items()):
+            try:
+                self._write({row_id: changes})
+            except (DataError, IntegrityError):
+                self._reject(row_id, changes)
+                continue
+            except Exception:
+                self._requeue(dict(list(pending.items())[index:]))
+                raise
+            written[row_id] = changes
+        return written
+
+    def _reject(self, row_id: int, changes: dict) -> None:
+        attempts = self._attempts.get(row_id, 0) + 1
+        if attempts < MAX_ATTEMPTS:
+            self._attempts[row_id] = attempts
+            self._requeue({row_id: changes})
+            return
+        self._attempts.pop(row_id, None)
+        self.dropped.append({"id": row_id, **changes})
+        logger.exception("Dropping write-behind update of %s %s after %d attempts: %s", self.model.__tablename__, row_id, attempts, changes)
+
+    def _requeue(self, pending: dict) -> None:
+        # Under anything submitted since, so no update is lost or reordered
+        with self._lock:
+            for row_id, changes in pending.items():
+                self._pending[row_id] = {**changes, **self._pending.get(row_id, {})}
+
+    def _validate(self, db: Session, row_id: int, changes: dict) -> None:
+        table = self.model.__table__
+        for name, value in changes.items():
+            if name == "id" or name not in table.c:
+                raise ValueError(f"Unknown column: {name}")
+            if isinstance(table.c[name].type, Integer) and value is not None and not INT_MIN <= value <= INT_MAX:
+                raise ValueError(f"{name} is out of range")
+        if not INT_MIN <= row_id <= INT_MAX or db.execute(select(table.c.id).where(table.c.id == row_id)).first() is None:
+            raise LookupError(f"{self.model.__name__} not found")
+        for name, value in changes.items():
+            for foreign_key in table.c[name].foreign_keys:
+                target = foreign_key.column
+                if value is not None and db.execute(select(target).where(target == value)).first() is None:
+                    raise LookupError(f"{_model_name(target.table)} not found")
+
+    def _write(self, pending: dict) -> None:
+        table = self.model.__table__
+        groups = defaultdict(list)
+        for row_id in sorted(pending):
+            changes = pending[row_id]
+            columns = tuple(sorted(changes))
+            groups[columns].append((row_id,) + tuple(changes[name] for name in columns))
+
+        db = database.SessionLocal()
+        try:
+            for columns, rows in groups.items():
+                changes = values(
+                    column("id", Integer), *(column(name, table.c[name].type) for name in columns), name="changes"
+                ).data(rows)
+                assignments = {name: cast(changes.c[name], table.c[name].type) for name in columns}
+                if "updated_at" in table.c:
+                    assignments["updated_at"] = func.now()
+                db.execute(update(table).where(table.c.id == changes.c.id).values(assignments))
+            db.commit()
+            self.commits += 1
+        finally:
+            db.close()
+
+
+def _model_name(table) -> str:
+    for mapper in database.Base.registry.mappers:
+        if mapper.local_table is table:
+            return mapper.class_.__name__
+    return table.name
+
+
+# Live match stats: minutes ticking, cards and goals
+player_match_performances = WriteBehindBuffer(database.PlayerMatchPerformance)